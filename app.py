@@ -1,5 +1,8 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
+import pyarrow as pa
+import pyarrow.csv as pa_csv
 import pyproj
 from pyproj import Transformer
 import io
@@ -7,11 +10,17 @@ import zipfile
 import json
 import xml.etree.ElementTree as ET
 from datetime import datetime
-from pathlib import Path
-import base64
 import folium
-from streamlit_folium import st_folium
+from folium.plugins import FastMarkerCluster
 import math
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import orjson  # Opcional: serialización JSON en C, más rápida que json
+except ImportError:
+    orjson = None
 
 # Configuración de la página
 st.set_page_config(
@@ -58,72 +67,208 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-def create_download_link(df, filename, file_format="csv"):
-    """Crea un enlace de descarga para el DataFrame"""
-    if file_format == "csv":
-        csv = df.to_csv(index=False)
-        b64 = base64.b64encode(csv.encode()).decode()
-        href = f'<a href="data:file/csv;base64,{b64}" download="{filename}.csv">📥 Descargar {filename}.csv</a>'
-    return href
+@st.cache_resource
+def _get_transformer(src_crs, dst_crs):
+    """Devuelve un Transformer reutilizable entre ejecuciones para el par de CRS"""
+    return Transformer.from_crs(src_crs, dst_crs, always_xy=True)
 
-def convert_wgs84_to_gk(df):
-    """Convierte coordenadas de WGS84 a Gauss-Krüger"""
-    transformer = Transformer.from_crs("EPSG:4326", "EPSG:22195", always_xy=True)
+# Cantidad de puntos a partir de la cual la transformación se reparte en hilos
+PARALLEL_THRESHOLD = 50_000
+
+def _transform_parallel(transformer, x, y, max_workers=None):
+    """
+    Transforma arrays de coordenadas repartiéndolos en bloques entre hilos.
+    
+    PROJ libera el GIL mientras transforma y pyproj mantiene un objeto PROJ
+    por hilo, así que el mismo Transformer puede compartirse entre bloques.
+    Para entradas chicas se usa una única llamada.
+    """
+    workers = max_workers or os.cpu_count() or 1
+    if workers < 2 or len(x) < PARALLEL_THRESHOLD:
+        return transformer.transform(x, y)
     
-    results = []
-    errors = []
+    # Arrays de salida reservados una sola vez: cada hilo transforma en el
+    # lugar su tramo, sin arrays intermedios por bloque ni concatenación final
+    out_x = np.array(x, dtype='float64')
+    out_y = np.array(y, dtype='float64')
+    bounds = np.linspace(0, len(out_x), workers + 1, dtype=int)
     
-    for idx, row in df.iterrows():
-        try:
-            lat = float(row['lat'])
-            lng = float(row['lng'])
-            nombre = row['nombre']
-            
-            easting, northing = transformer.transform(lng, lat)
-            
-            results.append({
-                'nombre': nombre,
-                'lat': lat,
-                'lng': lng,
-                'coordenadas_gauss_kruger_easting': easting,
-                'coordenadas_gauss_kruger_northing': northing
-            })
-            
-        except Exception as e:
-            errors.append(f"Error en fila {idx + 1}: {str(e)}")
+    def transform_block(start, stop):
+        transformer.transform(out_x[start:stop], out_y[start:stop], inplace=True)
     
-    return pd.DataFrame(results), errors
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(transform_block, bounds[:-1], bounds[1:]))
+    
+    return out_x, out_y
 
-def convert_gk_to_wgs84(df):
-    """Convierte coordenadas de Gauss-Krüger a WGS84"""
-    transformer = Transformer.from_crs("EPSG:22195", "EPSG:4326", always_xy=True)
+def _to_float_array(column):
+    """
+    Devuelve la columna como array float64 en un solo paso vectorizado.
     
-    results = []
-    errors = []
+    Las columnas ya numéricas se convierten directamente; las de texto se
+    convierten con pd.to_numeric y los valores inválidos quedan como NaN.
+    """
+    if not pd.api.types.is_numeric_dtype(column):
+        column = pd.to_numeric(column, errors='coerce')
+    return column.to_numpy(dtype='float64', na_value=np.nan)
+
+def _validate_coordinates(x, y, bounds=None):
+    """
+    Marca las filas que no se pueden transformar.
     
-    for idx, row in df.iterrows():
-        try:
-            easting = float(row['coordenadas_gauss_kruger_easting'])
-            northing = float(row['coordenadas_gauss_kruger_northing'])
-            nombre = row['nombre']
-            
-            lng, lat = transformer.transform(easting, northing)
-            
-            results.append({
-                'nombre': nombre,
-                'lat': lat,
-                'lng': lng,
-                'coordenadas_gauss_kruger_easting': easting,
-                'coordenadas_gauss_kruger_northing': northing
-            })
-            
-        except Exception as e:
-            errors.append(f"Error en fila {idx + 1}: {str(e)}")
+    Args:
+        x, y: Arrays float64 de coordenadas
+        bounds: Opcional, ((x_min, x_max), (y_min, y_max)) admitidos
     
-    return pd.DataFrame(results), errors
+    Returns:
+        Máscara booleana de filas inválidas y un dict {posición: motivo}
+    """
+    invalid = np.isnan(x)
+    invalid |= np.isnan(y)
+    problems = {i: "coordenadas no numéricas" for i in np.flatnonzero(invalid).tolist()}
+    
+    if bounds is not None:
+        (x_min, x_max), (y_min, y_max) = bounds
+        # Las comparaciones con NaN dan False, así que solo se marcan valores fuera de rango
+        out_of_range = (x < x_min) | (x > x_max) | (y < y_min) | (y > y_max)
+        problems.update((i, "coordenadas fuera de rango") for i in np.flatnonzero(out_of_range).tolist())
+        invalid |= out_of_range
+    
+    return invalid, problems
 
-def create_kml(df, name="Coordenadas"):
-    """Genera contenido KML a partir del DataFrame"""
+def _format_errors(df, columns, problems):
+    """Arma los mensajes de las filas inválidas con el nombre y los valores originales"""
+    rows = sorted(problems)
+    df_bad = df.iloc[rows][['nombre', *columns]]
+    return [f"Error en fila {i + 1} ({nombre}): {problems[i]} ({x}, {y})"
+            for i, (nombre, x, y) in zip(rows, df_bad.itertuples(index=False, name=None))]
+
+def _mark_failed(x, y, invalid, problems):
+    """
+    Detecta los puntos que PROJ no pudo transformar (los devuelve como inf).
+    
+    Agrega el motivo en `problems` con la posición de la fila original y
+    devuelve la máscara de puntos fallidos, o None si no hubo ninguno.
+    """
+    failed = ~(np.isfinite(x) & np.isfinite(y))
+    if not failed.any():
+        return None
+    
+    positions = np.flatnonzero(~invalid)[failed]
+    problems.update((i, "no se pudo transformar") for i in positions.tolist())
+    return failed
+
+def convert_wgs84_to_gk(df):
+    """Convierte coordenadas de WGS84 a Gauss-Krüger"""
+    transformer = _get_transformer("EPSG:4326", "EPSG:22195")
+    
+    lat = _to_float_array(df['lat'])
+    lng = _to_float_array(df['lng'])
+    
+    invalid, problems = _validate_coordinates(lng, lat, bounds=((-180, 180), (-90, 90)))
+    
+    nombres = df['nombre'].to_numpy()
+    # Filtrar solo si hace falta: evita copiar las columnas en el caso habitual
+    if invalid.any():
+        valid = ~invalid
+        nombres = nombres[valid]
+        lat = lat[valid]
+        lng = lng[valid]
+    
+    # Una sola llamada a PROJ para todas las filas
+    easting, northing = _transform_parallel(transformer, lng, lat)
+    
+    failed = _mark_failed(easting, northing, invalid, problems)
+    if failed is not None:
+        ok = ~failed
+        nombres, lat, lng, easting, northing = nombres[ok], lat[ok], lng[ok], easting[ok], northing[ok]
+    errors = _format_errors(df, ['lat', 'lng'], problems)
+    
+    # Construir el resultado por columnas, sin copiar los arrays
+    return pd.DataFrame({
+        'nombre': nombres,
+        'lat': lat,
+        'lng': lng,
+        'coordenadas_gauss_kruger_easting': easting,
+        'coordenadas_gauss_kruger_northing': northing
+    }, copy=False), errors
+
+def convert_gk_to_wgs84(df):
+    """Convierte coordenadas de Gauss-Krüger a WGS84"""
+    transformer = _get_transformer("EPSG:22195", "EPSG:4326")
+    
+    easting = _to_float_array(df['coordenadas_gauss_kruger_easting'])
+    northing = _to_float_array(df['coordenadas_gauss_kruger_northing'])
+    
+    invalid, problems = _validate_coordinates(easting, northing)
+    
+    nombres = df['nombre'].to_numpy()
+    # Filtrar solo si hace falta: evita copiar las columnas en el caso habitual
+    if invalid.any():
+        valid = ~invalid
+        nombres = nombres[valid]
+        easting = easting[valid]
+        northing = northing[valid]
+    
+    # Una sola llamada a PROJ para todas las filas
+    lng, lat = _transform_parallel(transformer, easting, northing)
+    
+    failed = _mark_failed(lng, lat, invalid, problems)
+    if failed is not None:
+        ok = ~failed
+        nombres, lat, lng, easting, northing = nombres[ok], lat[ok], lng[ok], easting[ok], northing[ok]
+    errors = _format_errors(df, ['coordenadas_gauss_kruger_easting', 'coordenadas_gauss_kruger_northing'], problems)
+    
+    # Construir el resultado por columnas, sin copiar los arrays
+    return pd.DataFrame({
+        'nombre': nombres,
+        'lat': lat,
+        'lng': lng,
+        'coordenadas_gauss_kruger_easting': easting,
+        'coordenadas_gauss_kruger_northing': northing
+    }, copy=False), errors
+
+@st.cache_data(show_spinner=False)
+def _load_csv(file_bytes):
+    """Lee el CSV subido; se vuelve a leer solo si cambia el contenido del archivo"""
+    # El lector de pyarrow parsea en paralelo y en C, más rápido en archivos grandes.
+    # 'nombre' se declara como texto en el propio parser (no después, cuando Arrow ya
+    # lo infirió como número): así se conservan valores como "001".
+    table = pa_csv.read_csv(
+        io.BytesIO(file_bytes),
+        convert_options=pa_csv.ConvertOptions(
+            column_types={'nombre': pa.string()},
+            strings_can_be_null=True
+        )
+    )
+    # Las columnas quedan respaldadas por Arrow, sin copiar a objetos de Python
+    return table.to_pandas(types_mapper=pd.ArrowDtype)
+
+@st.cache_data(show_spinner=False)
+def _load_kml(file_bytes):
+    """Extrae los vértices del KML subido; se vuelve a procesar solo si cambia el contenido del archivo"""
+    # Usar la función del script principal, leyendo directamente los bytes subidos
+    from convert_gk_to_wgs84 import parse_kml_polygon
+    return parse_kml_polygon(io.BytesIO(file_bytes))
+
+@st.cache_data(show_spinner=False)
+def _convert(_df, key, to_gk):
+    """
+    Convierte el DataFrame; se recalcula solo si cambian los datos o el sentido.
+    
+    La clave es la huella completa de `_frame_key`: Streamlit, al hashear un
+    DataFrame grande, solo toma una muestra de filas y podría devolver la
+    conversión de un archivo anterior con pocas filas corregidas.
+    """
+    if to_gk:
+        return convert_wgs84_to_gk(_df)
+    return convert_gk_to_wgs84(_df)
+
+# Cantidad de placemarks que se formatean por bloque al generar el KML
+KML_CHUNK_SIZE = 10_000
+
+def _iter_kml(df, name="Coordenadas"):
+    """Genera el KML por partes: encabezado, bloques de placemarks y cierre"""
     kml_template = """<?xml version="1.0" encoding="UTF-8"?>
 <kml xmlns="http://www.opengis.net/kml/2.2">
   <Document>
@@ -137,82 +282,219 @@ def create_kml(df, name="Coordenadas"):
     {placemarks}
   </Document>
 </kml>"""
+    header, footer = kml_template.split('{placemarks}')
+    yield header.format(name=name)
+    
+    if 'lat' in df.columns and 'lng' in df.columns:
+        for start in range(0, len(df), KML_CHUNK_SIZE):
+            block = df.iloc[start:start + KML_CHUNK_SIZE]
+            
+            # Formatear las columnas completas de una vez (printf de C sobre el array)
+            lng_str = np.char.mod('%.10f', block['lng'].to_numpy(dtype='float64'))
+            lat_str = np.char.mod('%.10f', block['lat'].to_numpy(dtype='float64'))
+            coords = np.char.add(np.char.add(lng_str, ','), lat_str)
+            
+            # Armar los placemarks del bloque con operaciones de texto sobre columnas
+            placemarks = (
+                '    <Placemark>\n      <name>' + block['nombre'].fillna('').astype(str) +
+                '</name>\n      <styleUrl>#pointStyle</styleUrl>\n      <Point>\n        <coordinates>' +
+                coords + ',0</coordinates>\n      </Point>\n    </Placemark>'
+            )
+            
+            if start:
+                yield '\n'
+            yield '\n'.join(placemarks.tolist())
+    
+    yield footer
+
+def create_kml(df, name="Coordenadas"):
+    """Genera contenido KML a partir del DataFrame"""
+    return ''.join(_iter_kml(df, name))
+
+def _frame_key(df):
+    """
+    Calcula una huella corta del contenido del DataFrame.
     
-    placemarks = []
-    for _, row in df.iterrows():
-        if 'lat' in row and 'lng' in row:
-            placemark = f"""    <Placemark>
-      <name>{row['nombre']}</name>
-      <styleUrl>#pointStyle</styleUrl>
-      <Point>
-        <coordinates>{row['lng']:.10f},{row['lat']:.10f},0</coordinates>
-      </Point>
-    </Placemark>"""
-            placemarks.append(placemark)
-    
-    return kml_template.format(name=name, placemarks='\n'.join(placemarks))
+    Se calcula una vez por ejecución y se pasa como clave a las funciones
+    cacheadas, que reciben el DataFrame como `_df` para que Streamlit no lo
+    vuelva a hashear en cada una.
+    """
+    row_hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    digest = hashlib.blake2b(row_hashes.tobytes(), digest_size=8)
+    digest.update(','.join(map(str, df.columns)).encode('utf-8'))
+    return digest.hexdigest()
+
+@st.cache_data
+def _to_csv_bytes(_df, key):
+    """Serializa el DataFrame a CSV una sola vez por contenido"""
+    return _df.to_csv(index=False).encode('utf-8')
+
+@st.cache_data
+def _to_kml_bytes(_df, key, name="Coordenadas"):
+    """Genera el KML una sola vez por contenido, escribiendo bloque a bloque"""
+    buffer = io.BytesIO()
+    for chunk in _iter_kml(_df, name):
+        buffer.write(chunk.encode('utf-8'))
+    return buffer.getvalue()
 
-def calculate_polygon_area_gk(coordinates_gk):
+@st.cache_data
+def _to_geojson_bytes(_df, key):
+    """Genera el GeoJSON de puntos una sola vez por contenido"""
+    geojson = {
+        "type": "FeatureCollection",
+        "features": [
+            {
+                "type": "Feature",
+                "properties": {"name": nombre},
+                "geometry": {
+                    "type": "Point",
+                    "coordinates": [lng, lat]
+                }
+            }
+            for nombre, lng, lat in zip(_df['nombre'].tolist(),
+                                        _df['lng'].tolist(),
+                                        _df['lat'].tolist())
+        ]
+    }
+    if orjson is not None:
+        return orjson.dumps(geojson)
+    # Separadores compactos: sin indentación, menos bytes para generar y descargar
+    return json.dumps(geojson, separators=(',', ':')).encode('utf-8')
+
+def calculate_polygon_area_gk(eastings, northings):
     """
     Calcula el área de un polígono usando coordenadas Gauss-Krüger.
     Usa la fórmula del área de Shoelace (coordenadas cartesianas).
     
     Args:
-        coordinates_gk: Lista de tuplas (easting, northing)
+        eastings: Array de coordenadas Este (X)
+        northings: Array de coordenadas Norte (Y), en el mismo orden
     
     Returns:
         Área en metros cuadrados
     """
-    if len(coordinates_gk) < 3:
+    if len(eastings) < 3:
         return 0
     
-    # Asegurar que el polígono esté cerrado
-    coords = list(coordinates_gk)
-    if coords[0] != coords[-1]:
-        coords.append(coords[0])
-    
-    # Fórmula de Shoelace
-    area = 0
-    n = len(coords) - 1
+    # Relativas al primer vértice: el área no cambia y se evita restar productos
+    # del orden de 1e13 (pérdida de precisión con coordenadas GK absolutas)
+    x = np.asarray(eastings, dtype=np.float64) - eastings[0]
+    y = np.asarray(northings, dtype=np.float64) - northings[0]
     
-    for i in range(n):
-        area += coords[i][0] * coords[i+1][1]
-        area -= coords[i+1][0] * coords[i][1]
-    
-    return abs(area) / 2
+    # Fórmula de Shoelace vectorizada; np.roll cierra el polígono (si ya estaba
+    # cerrado, el tramo extra es de longitud cero y no suma)
+    return abs(np.dot(x, np.roll(y, -1)) - np.dot(np.roll(x, -1), y)) / 2
 
-def calculate_polygon_area_wgs84(coordinates_wgs84):
+def calculate_polygon_area_wgs84(lats, lngs):
     """
     Calcula el área aproximada de un polígono usando coordenadas WGS84.
     Usa proyección local para pequeñas áreas.
     
     Args:
-        coordinates_wgs84: Lista de tuplas (lat, lng)
+        lats: Array de latitudes
+        lngs: Array de longitudes, en el mismo orden
     
     Returns:
         Área en metros cuadrados
     """
-    if len(coordinates_wgs84) < 3:
+    if len(lats) < 3:
         return 0
     
     # Convertir a coordenadas cartesianas locales
     # Usar el centro del polígono como origen
-    center_lat = sum(coord[0] for coord in coordinates_wgs84) / len(coordinates_wgs84)
-    center_lng = sum(coord[1] for coord in coordinates_wgs84) / len(coordinates_wgs84)
+    lats = np.asarray(lats, dtype=np.float64)
+    lngs = np.asarray(lngs, dtype=np.float64)
+    center_lat = lats.mean()
+    center_lng = lngs.mean()
     
     # Factores de conversión aproximados para Argentina
     lat_to_m = 111320  # metros por grado de latitud
     lng_to_m = 111320 * math.cos(math.radians(center_lat))  # metros por grado de longitud
     
-    # Convertir a coordenadas cartesianas locales
-    local_coords = []
-    for lat, lng in coordinates_wgs84:
-        x = (lng - center_lng) * lng_to_m
-        y = (lat - center_lat) * lat_to_m
-        local_coords.append((x, y))
-    
-    # Usar fórmula de Shoelace
-    return calculate_polygon_area_gk(local_coords)
+    # Usar fórmula de Shoelace sobre las coordenadas locales
+    return calculate_polygon_area_gk((lngs - center_lng) * lng_to_m, (lats - center_lat) * lat_to_m)
+
+# Por encima de esta cantidad de puntos el mapa usa un cluster renderizado en el navegador
+MAX_INDIVIDUAL_MARKERS = 200
+
+# Crea cada marcador del cluster con el mismo popup que los marcadores individuales.
+# Cada fila es [lat, lng, nombre, easting, northing].
+CLUSTER_MARKER_CALLBACK = """
+function (row) {
+    var marker = L.marker(new L.LatLng(row[0], row[1]), {
+        icon: L.AwesomeMarkers.icon({icon: 'info-sign', markerColor: 'red', prefix: 'glyphicon'})
+    });
+    marker.bindTooltip(row[2]);
+    marker.bindPopup(
+        '<b>' + row[2] + '</b><br><hr><b>🌍 WGS84:</b><br>' +
+        'Lat: ' + row[0].toFixed(10) + '<br>Lng: ' + row[1].toFixed(10) + '<br>' +
+        '<br><b>📐 Gauss-Krüger:</b><br>' +
+        'Easting: ' + row[3].toFixed(6) + '<br>Northing: ' + row[4].toFixed(6) + '<br>' +
+        '<small>EPSG:22195 - Zona 5</small>',
+        {maxWidth: 300}
+    );
+    return marker;
+}
+"""
+
+@st.cache_data(show_spinner=False)
+def _build_map_html(_df, key, bounds):
+    """
+    Genera el HTML del mapa folium con los puntos y el polígono.
+    
+    Se cachea por la huella del resultado (`key`), así las interacciones que no
+    cambian los datos no vuelven a construir ni serializar el mapa.
+    """
+    # Crear el mapa
+    m = folium.Map(tiles='OpenStreetMap')
+    
+    # Ajustar el mapa para mostrar todos los puntos
+    m.fit_bounds(bounds)
+    
+    if len(_df) <= MAX_INDIVIDUAL_MARKERS:
+        # Agregar marcadores para cada punto
+        for row in _df.itertuples(index=False):
+            # Crear popup con información de ambos sistemas de coordenadas
+            popup_content = f"""
+            <b>{row.nombre}</b><br>
+            <hr>
+            <b>🌍 WGS84:</b><br>
+            Lat: {row.lat:.10f}<br>
+            Lng: {row.lng:.10f}<br>
+            <br><b>📐 Gauss-Krüger:</b><br>
+            Easting: {row.coordenadas_gauss_kruger_easting:.6f}<br>
+            Northing: {row.coordenadas_gauss_kruger_northing:.6f}<br>
+            <small>EPSG:22195 - Zona 5</small>
+            """
+            
+            folium.Marker(
+                [row.lat, row.lng],
+                popup=folium.Popup(popup_content, max_width=300),
+                tooltip=row.nombre,
+                icon=folium.Icon(color='red', icon='info-sign')
+            ).add_to(m)
+    else:
+        # Muchos puntos: se agrupan y los marcadores y popups se crean en el navegador
+        marker_data = _df[['lat', 'lng']].assign(
+            nombre=_df['nombre'].astype(str),
+            easting=_df['coordenadas_gauss_kruger_easting'],
+            northing=_df['coordenadas_gauss_kruger_northing']
+        ).to_numpy().tolist()
+        FastMarkerCluster(marker_data, callback=CLUSTER_MARKER_CALLBACK).add_to(m)
+    
+    # Si hay más de 2 puntos, crear polígono
+    if len(_df) > 2:
+        # Leaflet cierra el polígono por sí mismo: no hace falta repetir el primer vértice
+        folium.Polygon(
+            locations=_df[['lat', 'lng']].to_numpy().tolist(),
+            color='blue',
+            weight=2,
+            fillColor='lightblue',
+            fillOpacity=0.3,
+            popup="Polígono del loteo"
+        ).add_to(m)
+    
+    return m.get_root().render()
 
 def main():
     # Título principal
@@ -345,17 +627,7 @@ def main():
         try:
             if "KML" in conversion_mode:
                 # Procesar archivo KML
-                # Guardar temporalmente el archivo KML
-                temp_kml_path = f"temp_{uploaded_file.name}"
-                with open(temp_kml_path, "wb") as f:
-                    f.write(uploaded_file.read())
-                
-                # Usar la función del script principal
-                from convert_gk_to_wgs84 import parse_kml_polygon
-                coordinates = parse_kml_polygon(temp_kml_path)
-                
-                # Limpiar archivo temporal
-                Path(temp_kml_path).unlink()
+                coordinates = _load_kml(uploaded_file.getvalue())
                 
                 if coordinates:
                     df_input = pd.DataFrame(coordinates, columns=['nombre', 'lat', 'lng'])
@@ -366,9 +638,9 @@ def main():
                     # Formatear coordenadas con mayor precisión
                     df_display = df_input.head(10).copy()
                     if 'lat' in df_display.columns:
-                        df_display['lat'] = df_display['lat'].apply(lambda x: f"{x:.10f}")
+                        df_display['lat'] = np.char.mod('%.10f', df_display['lat'].to_numpy(dtype='float64'))
                     if 'lng' in df_display.columns:
-                        df_display['lng'] = df_display['lng'].apply(lambda x: f"{x:.10f}")
+                        df_display['lng'] = np.char.mod('%.10f', df_display['lng'].to_numpy(dtype='float64'))
                     st.dataframe(df_display, use_container_width=True)
                     if len(df_input) > 10:
                         st.info(f"Mostrando los primeros 10 de {len(df_input)} vértices totales")
@@ -376,7 +648,7 @@ def main():
                     st.error("❌ No se encontraron coordenadas válidas en el archivo KML")
             else:
                 # Procesar archivo CSV
-                df_input = pd.read_csv(uploaded_file)
+                df_input = _load_csv(uploaded_file.getvalue())
                 st.success(f"✅ Archivo cargado: {len(df_input)} filas")
         except Exception as e:
             st.error(f"❌ Error al cargar el archivo: {str(e)}")
@@ -395,25 +667,27 @@ def main():
         else:
             required_cols = ['nombre', 'coordenadas_gauss_kruger_easting', 'coordenadas_gauss_kruger_northing']
         
-        missing_cols = [col for col in required_cols if col not in df_input.columns]
+        missing_cols = sorted(set(required_cols) - set(df_input.columns), key=required_cols.index)
         
         if missing_cols:
             st.error(f"❌ Faltan columnas requeridas: {', '.join(missing_cols)}")
         else:
             # Realizar conversión
             with st.spinner('🔄 Convirtiendo coordenadas...'):
+                input_key = _frame_key(df_input)
                 if conversion_mode == "WGS84 → Gauss-Krüger" or conversion_mode == "KML → Gauss-Krüger":
-                    df_result, errors = convert_wgs84_to_gk(df_input)
+                    df_result, errors = _convert(df_input, input_key, to_gk=True)
                     result_title = "Coordenadas en Gauss-Krüger"
                 else:
-                    df_result, errors = convert_gk_to_wgs84(df_input)
+                    df_result, errors = _convert(df_input, input_key, to_gk=False)
                     result_title = "Coordenadas en WGS84"
             
             # Mostrar errores si los hay
             if errors:
+                # Un solo bloque en lugar de un st.error por fila. Los mensajes traen valores
+                # del CSV tal cual: se muestran como texto plano, sin interpretar markdown
                 st.error("❌ Errores encontrados:")
-                for error in errors:
-                    st.error(error)
+                st.code("\n".join(errors), language=None)
             
             # Mostrar resultados
             if not df_result.empty:
@@ -424,21 +698,20 @@ def main():
                 </div>
                 """, unsafe_allow_html=True)
                 
-                # Mostrar tabla de resultados con mayor precisión
-                df_display_result = df_result.copy()
-                
-                # Formatear coordenadas con alta precisión
-                if 'lat' in df_display_result.columns:
-                    df_display_result['lat'] = df_display_result['lat'].apply(lambda x: f"{x:.10f}")
-                if 'lng' in df_display_result.columns:
-                    df_display_result['lng'] = df_display_result['lng'].apply(lambda x: f"{x:.10f}")
-                if 'coordenadas_gauss_kruger_easting' in df_display_result.columns:
-                    df_display_result['coordenadas_gauss_kruger_easting'] = df_display_result['coordenadas_gauss_kruger_easting'].apply(lambda x: f"{x:.6f}")
-                if 'coordenadas_gauss_kruger_northing' in df_display_result.columns:
-                    df_display_result['coordenadas_gauss_kruger_northing'] = df_display_result['coordenadas_gauss_kruger_northing'].apply(lambda x: f"{x:.6f}")
+                # Mostrar tabla de resultados con mayor precisión: las columnas numéricas se
+                # reemplazan por su texto formateado, sin copiar antes los float64 del resultado
+                df_display_result = df_result.assign(
+                    lat=np.char.mod('%.10f', df_result['lat'].to_numpy(dtype='float64')),
+                    lng=np.char.mod('%.10f', df_result['lng'].to_numpy(dtype='float64')),
+                    coordenadas_gauss_kruger_easting=np.char.mod('%.6f', df_result['coordenadas_gauss_kruger_easting'].to_numpy(dtype='float64')),
+                    coordenadas_gauss_kruger_northing=np.char.mod('%.6f', df_result['coordenadas_gauss_kruger_northing'].to_numpy(dtype='float64'))
+                )
                 
                 st.dataframe(df_display_result, use_container_width=True)
                 
+                # Una sola huella del resultado como clave de todo lo que se cachea a partir de él
+                result_key = _frame_key(df_result)
+                
                 # Mostrar mapa si hay coordenadas WGS84
                 if 'lat' in df_result.columns and 'lng' in df_result.columns:
                     st.subheader("🗺️ Visualización del polígono")
@@ -447,10 +720,10 @@ def main():
                     st.info("💡 **Tip**: Haz clic en los marcadores rojos 📍 para ver las coordenadas en ambos sistemas (WGS84 y Gauss-Krüger)")
                     
                     # Calcular bounds para mostrar todos los puntos con padding
-                    min_lat = df_result['lat'].min()
-                    max_lat = df_result['lat'].max()
-                    min_lng = df_result['lng'].min()
-                    max_lng = df_result['lng'].max()
+                    lat_values = df_result['lat'].to_numpy()
+                    lng_values = df_result['lng'].to_numpy()
+                    min_lat, max_lat = lat_values.min(), lat_values.max()
+                    min_lng, max_lng = lng_values.min(), lng_values.max()
                     
                     # Agregar padding (5% del rango en cada dirección)
                     lat_range = max_lat - min_lat
@@ -464,57 +737,11 @@ def main():
                         [max_lat + padding_lat, max_lng + padding_lng]   # Northeast
                     ]
                     
-                    # Crear el mapa
-                    m = folium.Map(tiles='OpenStreetMap')
-                    
-                    # Ajustar el mapa para mostrar todos los puntos
-                    m.fit_bounds(bounds)
-                    
-                    # Agregar marcadores para cada punto
-                    for idx, row in df_result.iterrows():
-                        # Crear popup con información de ambos sistemas de coordenadas
-                        popup_content = f"""
-                        <b>{row['nombre']}</b><br>
-                        <hr>
-                        <b>🌍 WGS84:</b><br>
-                        Lat: {row['lat']:.10f}<br>
-                        Lng: {row['lng']:.10f}<br>
-                        """
-                        
-                        # Agregar coordenadas Gauss-Krüger si están disponibles
-                        if 'coordenadas_gauss_kruger_easting' in row and 'coordenadas_gauss_kruger_northing' in row:
-                            popup_content += f"""
-                            <br><b>📐 Gauss-Krüger:</b><br>
-                            Easting: {row['coordenadas_gauss_kruger_easting']:.6f}<br>
-                            Northing: {row['coordenadas_gauss_kruger_northing']:.6f}<br>
-                            <small>EPSG:22195 - Zona 5</small>
-                            """
-                        
-                        folium.Marker(
-                            [row['lat'], row['lng']],
-                            popup=folium.Popup(popup_content, max_width=300),
-                            tooltip=row['nombre'],
-                            icon=folium.Icon(color='red', icon='info-sign')
-                        ).add_to(m)
-                    
-                    # Si hay más de 2 puntos, crear polígono
-                    if len(df_result) > 2:
-                        coordinates = [[row['lat'], row['lng']] for _, row in df_result.iterrows()]
-                        # Cerrar el polígono si no está cerrado
-                        if coordinates[0] != coordinates[-1]:
-                            coordinates.append(coordinates[0])
-                        
-                        folium.Polygon(
-                            locations=coordinates,
-                            color='blue',
-                            weight=2,
-                            fillColor='lightblue',
-                            fillOpacity=0.3,
-                            popup="Polígono del loteo"
-                        ).add_to(m)
+                    # El HTML del mapa se arma una sola vez por resultado
+                    map_html = _build_map_html(df_result, result_key, bounds)
                     
                     # Mostrar el mapa
-                    map_data = st_folium(m, width=700, height=500)
+                    st.iframe(map_html, width=700, height=500)
                     
                     # Información del mapa
                     center_lat = (min_lat + max_lat) / 2
@@ -525,13 +752,13 @@ def main():
                     if len(df_result) >= 3:
                         if 'coordenadas_gauss_kruger_easting' in df_result.columns and 'coordenadas_gauss_kruger_northing' in df_result.columns:
                             # Usar coordenadas Gauss-Krüger para mayor precisión
-                            gk_coords = [(row['coordenadas_gauss_kruger_easting'], row['coordenadas_gauss_kruger_northing']) 
-                                        for _, row in df_result.iterrows()]
-                            area_m2 = calculate_polygon_area_gk(gk_coords)
+                            area_m2 = calculate_polygon_area_gk(
+                                df_result['coordenadas_gauss_kruger_easting'].to_numpy(dtype='float64'),
+                                df_result['coordenadas_gauss_kruger_northing'].to_numpy(dtype='float64'))
                         else:
                             # Usar coordenadas WGS84
-                            wgs84_coords = [(row['lat'], row['lng']) for _, row in df_result.iterrows()]
-                            area_m2 = calculate_polygon_area_wgs84(wgs84_coords)
+                            area_m2 = calculate_polygon_area_wgs84(df_result['lat'].to_numpy(dtype='float64'),
+                                                                   df_result['lng'].to_numpy(dtype='float64'))
                         
                         # Convertir a diferentes unidades
                         area_ha = area_m2 / 10000  # hectáreas
@@ -552,10 +779,9 @@ def main():
                 col1, col2, col3 = st.columns(3)
                 
                 with col1:
-                    csv = df_result.to_csv(index=False)
                     st.download_button(
                         label="📄 Descargar CSV",
-                        data=csv,
+                        data=_to_csv_bytes(df_result, result_key),
                         file_name=f"coordenadas_convertidas_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
                         mime="text/csv"
                     )
@@ -563,35 +789,17 @@ def main():
                 # Solo generar KML para conversiones a WGS84
                 if conversion_mode == "Gauss-Krüger → WGS84":
                     with col2:
-                        kml_content = create_kml(df_result, "Coordenadas Convertidas")
                         st.download_button(
                             label="🗺️ Descargar KML",
-                            data=kml_content,
+                            data=_to_kml_bytes(df_result, result_key, "Coordenadas Convertidas"),
                             file_name=f"coordenadas_{datetime.now().strftime('%Y%m%d_%H%M%S')}.kml",
                             mime="application/vnd.google-earth.kml+xml"
                         )
                     
                     with col3:
-                        # Crear GeoJSON
-                        geojson = {
-                            "type": "FeatureCollection",
-                            "features": []
-                        }
-                        
-                        for _, row in df_result.iterrows():
-                            feature = {
-                                "type": "Feature",
-                                "properties": {"name": row['nombre']},
-                                "geometry": {
-                                    "type": "Point",
-                                    "coordinates": [row['lng'], row['lat']]
-                                }
-                            }
-                            geojson["features"].append(feature)
-                        
                         st.download_button(
                             label="🌍 Descargar GeoJSON",
-                            data=json.dumps(geojson, indent=2),
+                            data=_to_geojson_bytes(df_result, result_key),
                             file_name=f"coordenadas_{datetime.now().strftime('%Y%m%d_%H%M%S')}.geojson",
                             mime="application/geo+json"
                         )
@@ -626,39 +834,27 @@ def main():
     # Información de precisión en el footer
     st.markdown("---")
     
-    col1, col2, col3, col4 = st.columns(4)
-    
-    with col1:
-        st.markdown("""
-        <div style="text-align: center; padding: 10px;">
+    # Footer en un único bloque HTML
+    st.markdown("""
+    <div style="display: flex; justify-content: space-around; text-align: center;">
+        <div style="padding: 10px;">
             <h6>📐 Precisión GK</h6>
             <p style="margin: 0; font-size: 0.8em;">1 micrón<br><small>6 decimales</small></p>
         </div>
-        """, unsafe_allow_html=True)
-    
-    with col2:
-        st.markdown("""
-        <div style="text-align: center; padding: 10px;">
+        <div style="padding: 10px;">
             <h6>🌍 Precisión WGS84</h6>
             <p style="margin: 0; font-size: 0.8em;">1.1 cm<br><small>10 decimales</small></p>
         </div>
-        """, unsafe_allow_html=True)
-    
-    with col3:
-        st.markdown("""
-        <div style="text-align: center; padding: 10px;">
+        <div style="padding: 10px;">
             <h6>📍 Zona</h6>
             <p style="margin: 0; font-size: 0.8em;">Argentina Central<br><small>EPSG:22195</small></p>
         </div>
-        """, unsafe_allow_html=True)
-    
-    with col4:
-        st.markdown("""
-        <div style="text-align: center; padding: 10px;">
+        <div style="padding: 10px;">
             <h6>✅ Certificación</h6>
             <p style="margin: 0; font-size: 0.8em;">IGN y colegios<br><small>de agrimensores</small></p>
         </div>
-        """, unsafe_allow_html=True)
+    </div>
+    """, unsafe_allow_html=True)
 
 if __name__ == "__main__":
     main()
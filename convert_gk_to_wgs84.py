@@ -9,160 +9,599 @@ Uso:
     # Convertir de WGS84 a Gauss-Krüger:
     python convert_gk_to_wgs84.py wgs84_to_gk input.csv output_base_name
     
+    # GeoJSON indentado (por defecto se escribe compacto):
+    python convert_gk_to_wgs84.py gk_to_wgs84 input.csv output_base_name --pretty
+    
     Esto generará archivos:
     - output_base_name.csv: Coordenadas en formato CSV
     - output_base_name.kml: Polígono en formato KML (solo para conversiones a WGS84)
     - output_base_name.geojson: Polígono en formato GeoJSON (solo para conversiones a WGS84)
 """
 
+from __future__ import annotations
+
+import argparse
+import contextlib
 import csv
+import io
 import json
+import math
+import os
+import struct
 import sys
+import warnings
 import zipfile
-import xml.etree.ElementTree as ET
 from pathlib import Path
 from datetime import datetime
-from typing import List, Tuple, Dict, Any
+from functools import lru_cache
+from typing import TYPE_CHECKING, List, Tuple, Dict, Any, BinaryIO, Iterable, Union, Optional, Set
+import numpy as np
 import pyproj
 from pyproj import Transformer
 
-def parse_kml_polygon(kml_path: str) -> List[Tuple[float, float, str]]:
-    """Extrae vértices de polígonos de un archivo KML.
+try:
+    # Opcional: lxml parsea con libxml2 (C), bastante más rápido en KML grandes
+    from lxml import etree as ET
+    _HAS_LXML = True
+except ImportError:
+    import xml.etree.ElementTree as ET
+    _HAS_LXML = False
+
+try:
+    import orjson  # Opcional: serialización JSON en C, más rápida que json
+except ImportError:
+    orjson = None
+
+try:
+    import pyogrio  # Opcional: salida GeoPackage (--formats gpkg)
+except ImportError:
+    pyogrio = None
+
+if TYPE_CHECKING:
+    # pandas se importa recién al leer un CSV (ver _read_coordinate_csv): su import es
+    # lento y --help, los errores de uso y los modos KML no lo necesitan
+    import pandas as pd
+
+# Pipelines PROJ explícitos (los mismos que resuelve from_crs, con la transformación
+# Campo Inchauspe -> WGS 84 de 3 parámetros): evitan la búsqueda en la base de CRS
+_PIPELINES = {
+    ("EPSG:22195", "EPSG:4326"): (
+        "+proj=pipeline "
+        "+step +inv +proj=tmerc +lat_0=-90 +lon_0=-60 +k=1 +x_0=5500000 +y_0=0 +ellps=intl "
+        "+step +proj=push +v_3 "
+        "+step +proj=cart +ellps=intl "
+        "+step +proj=helmert +x=-148 +y=136 +z=90 "
+        "+step +inv +proj=cart +ellps=WGS84 "
+        "+step +proj=pop +v_3 "
+        "+step +proj=unitconvert +xy_in=rad +xy_out=deg"
+    ),
+    ("EPSG:4326", "EPSG:22195"): (
+        "+proj=pipeline "
+        "+step +proj=unitconvert +xy_in=deg +xy_out=rad "
+        "+step +proj=push +v_3 "
+        "+step +proj=cart +ellps=WGS84 "
+        "+step +proj=helmert +x=148 +y=-136 +z=-90 "
+        "+step +inv +proj=cart +ellps=intl "
+        "+step +proj=pop +v_3 "
+        "+step +proj=tmerc +lat_0=-90 +lon_0=-60 +k=1 +x_0=5500000 +y_0=0 +ellps=intl"
+    ),
+}
+
+@lru_cache(maxsize=8)
+def _get_transformer(src_crs: str, dst_crs: str) -> Transformer:
+    """Devuelve un Transformer reutilizable entre llamadas para el par de CRS dado.
+    
+    Trabaja siempre en orden x/y (lng/lat, easting/northing).
+    """
+    pipeline = _PIPELINES.get((src_crs, dst_crs))
+    if pipeline is not None:
+        return Transformer.from_pipeline(pipeline)
+    return Transformer.from_crs(src_crs, dst_crs, always_xy=True)
+
+# Archivos de salida que se pueden pedir con --formats
+OUTPUT_FORMATS = ('csv', 'kml', 'kmz', 'geojson', 'gpkg')
+
+# Los que se generan si no se indica nada (GeoPackage solo a pedido: requiere pyogrio)
+DEFAULT_FORMATS = ('csv', 'kml', 'kmz', 'geojson')
+
+# Buffer de escritura de los CSV de salida: menos llamadas write() en archivos grandes
+IO_BUFFER_SIZE = 1 << 20
+
+# Filas por bloque al convertir CSV de WGS84 a Gauss-Krüger
+CHUNK_SIZE = 100_000
+
+# Motores de transformación: 'auto' elige por tamaño de lote, los demás se fuerzan.
+# 'affine' (solo GK -> WGS84) es a pedido: aproxima con error de hasta ~1 mm.
+TRANSFORM_BACKENDS = ('auto', 'pyproj', 'numba', 'affine')
+
+def _turbocharge(transformer: Transformer, xs: np.ndarray, ys: np.ndarray,
+                 threshold: float = 1e-8) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    """Aproxima la transformación con un ajuste afín sobre el bbox de los puntos.
+    
+    En polígonos chicos dentro de una misma faja la proyección inversa es casi
+    lineal: se ajusta con 9 puntos de control reales y se valida contra una
+    grilla de 4x4 con error máximo ``threshold`` (en grados, 1e-8 ≈ 1 mm).
     
-    Args:
-        kml_path: Ruta al archivo KML
-        
     Returns:
-        Lista de tuplas (nombre, lat, lng) con los vértices del polígono
+        Tupla (lngs, lats), o None si la aproximación no alcanza la precisión
     """
-    coordinates = []
+    x_min, x_max = xs.min(), xs.max()
+    y_min, y_max = ys.min(), ys.max()
     
-    try:
-        # Parsear el archivo KML
-        tree = ET.parse(kml_path)
-        root = tree.getroot()
+    # Con valores no finitos el bbox no sirve
+    if not np.isfinite([x_min, x_max, y_min, y_max]).all():
+        return None
+    
+    def grid(n):
+        gx, gy = np.meshgrid(np.linspace(x_min, x_max, n), np.linspace(y_min, y_max, n))
+        return gx.ravel(), gy.ravel()
+    
+    # Ajuste por mínimos cuadrados: [lng, lat] = c0 + c1*dx + c2*dy
+    ctrl_x, ctrl_y = grid(3)
+    design = np.column_stack([np.ones_like(ctrl_x), ctrl_x - x_min, ctrl_y - y_min])
+    coef = np.linalg.lstsq(design, np.column_stack(transformer.transform(ctrl_x, ctrl_y)), rcond=None)[0]
+    
+    # Validación en puntos distintos a los de control
+    val_x, val_y = grid(4)
+    val_lng, val_lat = transformer.transform(val_x, val_y)
+    pred = np.column_stack([np.ones_like(val_x), val_x - x_min, val_y - y_min]) @ coef
+    error = np.abs(pred - np.column_stack([val_lng, val_lat])).max()
+    
+    # Puntos fuera de dominio (inf) tampoco sirven
+    if not error <= threshold:
+        return None
+    
+    dx = xs - x_min
+    dy = ys - y_min
+    lngs = coef[0, 0] + coef[1, 0] * dx + coef[2, 0] * dy
+    lats = coef[0, 1] + coef[1, 1] * dx + coef[2, 1] * dy
+    return lngs, lats
+
+# Kernel numba para GK faja 5 (EPSG:22195) -> WGS84: mismo pipeline que PROJ.
+# Transversa de Mercator inversa (serie de Krüger de orden 6, ellps=intl),
+# traslación de 3 parámetros Campo Inchauspe -> WGS 84 y vuelta a geodésicas.
+NUMBA_MIN_POINTS = 10_000
+_prange = range  # numba.prange al compilar (ver _numba_kernel)
+
+_INTL_A, _INTL_F = 6378388.0, 1 / 297.0
+_WGS84_A, _WGS84_F = 6378137.0, 1 / 298.257223563
+_GK_X_0, _GK_LON_0 = 5500000.0, math.radians(-60.0)
+_HELMERT_X, _HELMERT_Y, _HELMERT_Z = -148.0, 136.0, 90.0
+
+_N = _INTL_F / (2 - _INTL_F)
+_TM_A = _INTL_A / (1 + _N) * (1 + _N**2 / 4 + _N**4 / 64 + _N**6 / 256)
+_TM_BETA = np.array([
+    _N / 2 - 2 * _N**2 / 3 + 37 * _N**3 / 96 - _N**4 / 360 - 81 * _N**5 / 512 + 96199 * _N**6 / 604800,
+    _N**2 / 48 + _N**3 / 15 - 437 * _N**4 / 1440 + 46 * _N**5 / 105 - 1118711 * _N**6 / 3870720,
+    17 * _N**3 / 480 - 37 * _N**4 / 840 - 209 * _N**5 / 4480 + 5569 * _N**6 / 90720,
+    4397 * _N**4 / 161280 - 11 * _N**5 / 504 - 830251 * _N**6 / 7257600,
+    4583 * _N**5 / 161280 - 108847 * _N**6 / 3991680,
+    20648693 * _N**6 / 638668800,
+])
+_TM_DELTA = np.array([
+    2 * _N - 2 * _N**2 / 3 - 2 * _N**3 + 116 * _N**4 / 45 + 26 * _N**5 / 45 - 2854 * _N**6 / 675,
+    7 * _N**2 / 3 - 8 * _N**3 / 5 - 227 * _N**4 / 45 + 2704 * _N**5 / 315 + 2323 * _N**6 / 945,
+    56 * _N**3 / 15 - 136 * _N**4 / 35 - 1262 * _N**5 / 105 + 73814 * _N**6 / 2835,
+    4279 * _N**4 / 630 - 332 * _N**5 / 35 - 399572 * _N**6 / 14175,
+    4174 * _N**5 / 315 - 144838 * _N**6 / 6237,
+    601676 * _N**6 / 22275,
+])
+
+_TM_ALPHA = np.array([
+    _N / 2 - 2 * _N**2 / 3 + 5 * _N**3 / 16 + 41 * _N**4 / 180 - 127 * _N**5 / 288 + 7891 * _N**6 / 37800,
+    13 * _N**2 / 48 - 3 * _N**3 / 5 + 557 * _N**4 / 1440 + 281 * _N**5 / 630 - 1983433 * _N**6 / 1935360,
+    61 * _N**3 / 240 - 103 * _N**4 / 140 + 15061 * _N**5 / 26880 + 167603 * _N**6 / 181440,
+    49561 * _N**4 / 161280 - 179 * _N**5 / 168 + 6601661 * _N**6 / 7257600,
+    34729 * _N**5 / 80640 - 3418889 * _N**6 / 1995840,
+    212378941 * _N**6 / 319334400,
+])
+_TM_CHI = np.array([
+    -2 * _N + 2 * _N**2 / 3 + 4 * _N**3 / 3 - 82 * _N**4 / 45 + 32 * _N**5 / 45 + 4642 * _N**6 / 4725,
+    5 * _N**2 / 3 - 16 * _N**3 / 15 - 13 * _N**4 / 9 + 904 * _N**5 / 315 - 1522 * _N**6 / 945,
+    -26 * _N**3 / 15 + 34 * _N**4 / 21 + 8 * _N**5 / 5 - 12686 * _N**6 / 2835,
+    1237 * _N**4 / 630 - 12 * _N**5 / 5 - 24832 * _N**6 / 14175,
+    -734 * _N**5 / 315 + 109598 * _N**6 / 31185,
+    444337 * _N**6 / 155925,
+])
+
+def _gk_to_wgs84_kernel(xs, ys, out_lngs, out_lats):
+    """Transforma GK faja 5 -> WGS84 punto a punto (compilado con numba si está disponible)."""
+    e2_intl = _INTL_F * (2 - _INTL_F)
+    e2_wgs = _WGS84_F * (2 - _WGS84_F)
+    b_wgs = _WGS84_A * (1 - _WGS84_F)
+    ep2_wgs = e2_wgs / (1 - e2_wgs)
+    for i in _prange(xs.size):
+        # Como PROJ: entradas infinitas dan salida infinita
+        if math.isinf(xs[i]) or math.isinf(ys[i]):
+            out_lngs[i] = out_lats[i] = math.inf
+            continue
+        
+        # Coordenadas normalizadas; lat_0=-90 pone el origen de northing en el polo sur
+        xi = ys[i] / _TM_A - math.pi / 2
+        eta = (xs[i] - _GK_X_0) / _TM_A
+        # Múltiplos de ángulo por recurrencia: sin/cos(2jξ) y sinh/cosh(2jη) sin más llamadas trigonométricas
+        s2, c2 = math.sin(2 * xi), math.cos(2 * xi)
+        sh2, ch2 = math.sinh(2 * eta), math.cosh(2 * eta)
+        s, c, sh, ch = s2, c2, sh2, ch2
+        xi_p, eta_p = xi, eta
+        for j in range(6):
+            xi_p -= _TM_BETA[j] * s * ch
+            eta_p -= _TM_BETA[j] * c * sh
+            s, c = s * c2 + c * s2, c * c2 - s * s2
+            sh, ch = sh * ch2 + ch * sh2, ch * ch2 + sh * sh2
+        
+        # Latitud conforme -> geodésica, y longitud
+        chi = math.asin(math.sin(xi_p) / math.cosh(eta_p))
+        lam = math.atan2(math.sinh(eta_p), math.cos(xi_p)) + _GK_LON_0
+        s2, c2 = math.sin(2 * chi), math.cos(2 * chi)
+        s, c = s2, c2
+        phi = chi
+        for j in range(6):
+            phi += _TM_DELTA[j] * s
+            s, c = s * c2 + c * s2, c * c2 - s * s2
+        
+        # Geocéntricas sobre Internacional 1924 (h=0) y traslación a WGS 84
+        sin_phi = math.sin(phi)
+        nu = _INTL_A / math.sqrt(1 - e2_intl * sin_phi * sin_phi)
+        x = nu * math.cos(phi) * math.cos(lam) + _HELMERT_X
+        y = nu * math.cos(phi) * math.sin(lam) + _HELMERT_Y
+        z = nu * (1 - e2_intl) * sin_phi + _HELMERT_Z
+        
+        # Geocéntricas -> geodésicas WGS 84 (fórmula de Bowring)
+        p = math.hypot(x, y)
+        theta = math.atan2(z * _WGS84_A, p * b_wgs)
+        sin_t, cos_t = math.sin(theta), math.cos(theta)
+        out_lats[i] = math.degrees(math.atan2(z + ep2_wgs * b_wgs * sin_t**3, p - e2_wgs * _WGS84_A * cos_t**3))
+        out_lngs[i] = math.degrees(math.atan2(y, x))
+
+
+def _wgs84_to_gk_kernel(lngs, lats, out_xs, out_ys):
+    """Transforma WGS84 -> GK faja 5 punto a punto (compilado con numba si está disponible)."""
+    e2_intl = _INTL_F * (2 - _INTL_F)
+    b_intl = _INTL_A * (1 - _INTL_F)
+    ep2_intl = e2_intl / (1 - e2_intl)
+    e2_wgs = _WGS84_F * (2 - _WGS84_F)
+    for i in _prange(lngs.size):
+        # Como PROJ: entradas infinitas dan salida infinita
+        if math.isinf(lngs[i]) or math.isinf(lats[i]):
+            out_xs[i] = out_ys[i] = math.inf
+            continue
+        
+        # Geocéntricas sobre WGS 84 (h=0) y traslación a Campo Inchauspe
+        phi, lam = math.radians(lats[i]), math.radians(lngs[i])
+        sin_phi = math.sin(phi)
+        nu = _WGS84_A / math.sqrt(1 - e2_wgs * sin_phi * sin_phi)
+        x = nu * math.cos(phi) * math.cos(lam) - _HELMERT_X
+        y = nu * math.cos(phi) * math.sin(lam) - _HELMERT_Y
+        z = nu * (1 - e2_wgs) * sin_phi - _HELMERT_Z
         
-        # Namespace de KML
-        ns = {'kml': 'http://www.opengis.net/kml/2.2'}
+        # Geocéntricas -> geodésicas sobre Internacional 1924 (fórmula de Bowring)
+        p = math.hypot(x, y)
+        theta = math.atan2(z * _INTL_A, p * b_intl)
+        sin_t, cos_t = math.sin(theta), math.cos(theta)
+        phi = math.atan2(z + ep2_intl * b_intl * sin_t**3, p - e2_intl * _INTL_A * cos_t**3)
+        lam = math.atan2(y, x) - _GK_LON_0
+        if lam > math.pi:
+            lam -= 2 * math.pi
         
-        # Buscar todos los polígonos
-        polygons = root.findall('.//kml:Polygon', ns)
+        # Latitud geodésica -> conforme
+        s2, c2 = math.sin(2 * phi), math.cos(2 * phi)
+        s, c = s2, c2
+        chi = phi
+        for j in range(6):
+            chi += _TM_CHI[j] * s
+            s, c = s * c2 + c * s2, c * c2 - s * s2
         
-        for i, polygon in enumerate(polygons):
-            # Buscar el anillo exterior (outerBoundaryIs)
-            outer_boundary = polygon.find('.//kml:outerBoundaryIs/kml:LinearRing/kml:coordinates', ns)
+        # Transversa de Mercator directa (serie de Krüger de orden 6)
+        cos_chi = math.cos(chi)
+        xi_p = math.atan2(math.sin(chi), cos_chi * math.cos(lam))
+        eta_p = math.atanh(cos_chi * math.sin(lam))
+        s2, c2 = math.sin(2 * xi_p), math.cos(2 * xi_p)
+        sh2, ch2 = math.sinh(2 * eta_p), math.cosh(2 * eta_p)
+        s, c, sh, ch = s2, c2, sh2, ch2
+        xi, eta = xi_p, eta_p
+        for j in range(6):
+            xi += _TM_ALPHA[j] * s * ch
+            eta += _TM_ALPHA[j] * c * sh
+            s, c = s * c2 + c * s2, c * c2 - s * s2
+            sh, ch = sh * ch2 + ch * sh2, ch * ch2 + sh * sh2
+        
+        out_xs[i] = _TM_A * eta + _GK_X_0
+        out_ys[i] = _TM_A * (xi + math.pi / 2)
+
+@lru_cache(maxsize=None)
+def _numba_kernel(kernel):
+    """Compila ``kernel`` con numba la primera vez que se usa; None si numba no está instalado.
+    
+    numba (opcional) se importa recién acá: su import es lento y solo vale la pena
+    en lotes grandes.
+    """
+    try:
+        import numba
+    except ImportError:
+        return None
+    # Los kernels toman _prange al compilarse
+    global _prange
+    _prange = numba.prange
+    return numba.njit(parallel=True, cache=True)(kernel)
+
+def _check_backend(backend: str) -> None:
+    """Valida el motor de transformación pedido."""
+    if backend not in TRANSFORM_BACKENDS:
+        raise ValueError(f"Motor de transformación desconocido: {backend} "
+                         f"(opciones: {', '.join(TRANSFORM_BACKENDS)})")
+    if backend == 'numba' and _numba_kernel(_gk_to_wgs84_kernel) is None:
+        raise ValueError("El motor 'numba' requiere tener instalado numba")
+
+def _transform_gk_to_wgs84(transformer: Transformer, xs: np.ndarray, ys: np.ndarray,
+                           backend: str = 'auto') -> Tuple[np.ndarray, np.ndarray]:
+    """Transforma GK -> WGS84 por el camino más rápido disponible para el tamaño del lote.
+    
+    Con ``backend='auto'`` usa el kernel numba en lotes grandes (si está instalado)
+    y si no PROJ, que transforma en el lugar sobre ``xs``/``ys``. 'pyproj' y
+    'numba' fuerzan ese motor; 'affine' usa el ajuste afín si alcanza la
+    precisión y si no PROJ.
+    
+    Returns:
+        Tupla (lngs, lats)
+    """
+    if backend == 'numba':
+        lngs, lats = np.empty_like(xs), np.empty_like(ys)
+        _numba_kernel(_gk_to_wgs84_kernel)(xs, ys, lngs, lats)
+        return lngs, lats
+    if backend == 'pyproj':
+        return transformer.transform(xs, ys, inplace=True)
+    if backend == 'affine':
+        result = _turbocharge(transformer, xs, ys) if len(xs) else None
+        if result is not None:
+            return result
+        return transformer.transform(xs, ys, inplace=True)
+    
+    kernel = _numba_kernel(_gk_to_wgs84_kernel) if len(xs) > NUMBA_MIN_POINTS else None
+    if kernel is not None:
+        lngs, lats = np.empty_like(xs), np.empty_like(ys)
+        kernel(xs, ys, lngs, lats)
+        return lngs, lats
+    
+    return transformer.transform(xs, ys, inplace=True)
+
+def _transform_wgs84_to_gk(transformer: Transformer, lngs: np.ndarray, lats: np.ndarray,
+                           backend: str = 'auto') -> Tuple[np.ndarray, np.ndarray]:
+    """Transforma WGS84 -> GK con PROJ (en el lugar) o con el kernel numba.
+    
+    Con ``backend='auto'`` usa numba en lotes grandes si está instalado; 'affine'
+    no aplica en este sentido y usa PROJ.
+    
+    Returns:
+        Tupla (eastings, northings)
+    """
+    kernel = None
+    if backend == 'numba' or (backend == 'auto' and len(lngs) > NUMBA_MIN_POINTS):
+        kernel = _numba_kernel(_wgs84_to_gk_kernel)
+    if kernel is not None:
+        xs, ys = np.empty_like(lngs), np.empty_like(lats)
+        kernel(lngs, lats, xs, ys)
+        return xs, ys
+    return transformer.transform(lngs, lats, inplace=True)
+
+def _parse_coordinates_text(coords_text: str, n_tuples: int) -> Optional[np.ndarray]:
+    """Parsea en C un bloque KML 'lng,lat[,alt] lng,lat[,alt] ...' a un array (n, k).
+    
+    Devuelve None si las tuplas no tienen todas la misma cantidad de componentes
+    o hay valores inválidos.
+    """
+    if n_tuples == 0:
+        return None
+    n_components = coords_text.count(',') // n_tuples + 1
+    if n_components < 2 or coords_text.count(',') != n_tuples * (n_components - 1):
+        return None
+    
+    with warnings.catch_warnings():
+        # Versiones viejas de NumPy avisan con DeprecationWarning en lugar de fallar
+        warnings.simplefilter('error', DeprecationWarning)
+        try:
+            values = np.fromstring(coords_text.replace(',', ' '), dtype=np.float64, sep=' ')
+        except (ValueError, DeprecationWarning):
+            return None
+    
+    if values.size != n_tuples * n_components:
+        return None
+    return values.reshape(n_tuples, n_components)
+
+# Namespace de KML
+_KML_NS = {'kml': 'http://www.opengis.net/kml/2.2'}
+_KML_POLYGON_TAG = '{http://www.opengis.net/kml/2.2}Polygon'
+_KML_PLACEMARK_TAG = '{http://www.opengis.net/kml/2.2}Placemark'
+
+def _kml_finder(path: str):
+    """Devuelve una función elem -> primer subelemento que cumple ``path`` (o None).
+    
+    Con lxml la expresión se compila una sola vez a XPath y se evalúa en C;
+    con ElementTree se usa ``find``.
+    """
+    if not _HAS_LXML:
+        return lambda elem: elem.find(path, _KML_NS)
+    xpath = ET.XPath(path, namespaces=_KML_NS)
+    
+    def find(elem):
+        result = xpath(elem)
+        return result[0] if result else None
+    return find
+
+_find_outer_coordinates = _kml_finder('.//kml:outerBoundaryIs/kml:LinearRing/kml:coordinates')
+_find_placemark_name = _kml_finder('kml:name')
+_find_point_coordinates = _kml_finder('.//kml:Point/kml:coordinates')
+
+def _iterparse_kml(kml_path: Union[str, BinaryIO], tags: Tuple[str, ...]):
+    """Recorre el KML en streaming, devolviendo cada elemento de ``tags`` al cerrarse."""
+    if not _HAS_LXML:
+        return ET.iterparse(kml_path, events=('end',))
+    # Sin resolución de entidades ni red; huge_tree admite nodos de texto enormes
+    return ET.iterparse(kml_path, events=('end',), tag=tags, resolve_entities=False,
+                        no_network=True, huge_tree=True)
+
+def iter_kml_coordinates(kml_path: Union[str, BinaryIO]):
+    """Genera los vértices (nombre, lat, lng) de un KML sin cargar todo el árbol.
+    
+    Cada Polygon y Placemark se libera apenas se procesa. Los vértices de polígonos
+    salen a medida que se leen; los puntos sueltos se emiten al final, igual que
+    en el orden histórico de ``parse_kml_polygon``.
+    
+    Args:
+        kml_path: Ruta al archivo KML o un objeto tipo archivo (binario) ya abierto
+    """
+    n_vertices = 0
+    n_polygons = 0
+    points = []
+    
+    try:
+        for _, elem in _iterparse_kml(kml_path, (_KML_POLYGON_TAG, _KML_PLACEMARK_TAG)):
+            if elem.tag == _KML_POLYGON_TAG:
+                i = n_polygons
+                n_polygons += 1
+                
+                # Buscar el anillo exterior (outerBoundaryIs)
+                outer_boundary = _find_outer_coordinates(elem)
+                
+                if outer_boundary is not None and outer_boundary.text:
+                    # Parsear las coordenadas (formato: lng,lat,alt lng,lat,alt ...)
+                    coords_text = outer_boundary.text.strip()
+                    coord_pairs = coords_text.split()
+                    
+                    # Camino rápido: todo el bloque parseado en C
+                    values = _parse_coordinates_text(coords_text, len(coord_pairs))
+                    if values is not None:
+                        names = [f"Polígono_{i+1}_Vértice_{j+1}" for j in range(len(values))]
+                        n_vertices += len(names)
+                        yield from zip(names, values[:, 1].tolist(), values[:, 0].tolist())
+                    else:
+                        # Bloque irregular o con errores: tupla por tupla, informando cada error
+                        for j, coord_pair in enumerate(coord_pairs):
+                            try:
+                                parts = coord_pair.split(',')
+                                if len(parts) >= 2:
+                                    lng = float(parts[0])
+                                    lat = float(parts[1])
+                                    
+                                    # Nombre del vértice
+                                    vertex_name = f"Polígono_{i+1}_Vértice_{j+1}"
+                                    
+                                    n_vertices += 1
+                                    yield (vertex_name, lat, lng)
+                            except (ValueError, IndexError) as e:
+                                print(f"Error parseando coordenada '{coord_pair}': {e}")
+                                continue
+                
+                elem.clear()
             
-            if outer_boundary is not None and outer_boundary.text:
-                # Parsear las coordenadas (formato: lng,lat,alt lng,lat,alt ...)
-                coords_text = outer_boundary.text.strip()
-                coord_pairs = coords_text.split()
+            elif elem.tag == _KML_PLACEMARK_TAG:
+                # Puntos individuales (Placemark con Point)
+                name_elem = _find_placemark_name(elem)
+                point_elem = _find_point_coordinates(elem)
                 
-                for j, coord_pair in enumerate(coord_pairs):
+                if point_elem is not None and point_elem.text:
                     try:
-                        parts = coord_pair.split(',')
+                        coords_text = point_elem.text.strip()
+                        parts = coords_text.split(',')
                         if len(parts) >= 2:
                             lng = float(parts[0])
                             lat = float(parts[1])
-                            
-                            # Nombre del vértice
-                            vertex_name = f"Polígono_{i+1}_Vértice_{j+1}"
-                            
-                            coordinates.append((vertex_name, lat, lng))
+                            name = name_elem.text if name_elem is not None and name_elem.text else None
+                            points.append((name, lat, lng))
                     except (ValueError, IndexError) as e:
-                        print(f"Error parseando coordenada '{coord_pair}': {e}")
-                        continue
-        
-        # También buscar puntos individuales (Placemark con Point)
-        placemarks = root.findall('.//kml:Placemark', ns)
-        
-        for placemark in placemarks:
-            name_elem = placemark.find('kml:name', ns)
-            point_elem = placemark.find('.//kml:Point/kml:coordinates', ns)
-            
-            if point_elem is not None and point_elem.text:
-                try:
-                    coords_text = point_elem.text.strip()
-                    parts = coords_text.split(',')
-                    if len(parts) >= 2:
-                        lng = float(parts[0])
-                        lat = float(parts[1])
-                        
-                        # Usar el nombre del placemark o generar uno
-                        point_name = name_elem.text if name_elem is not None and name_elem.text else f"Punto_{len(coordinates)+1}"
-                        
-                        coordinates.append((point_name, lat, lng))
-                except (ValueError, IndexError) as e:
-                    print(f"Error parseando punto: {e}")
-                    continue
+                        print(f"Error parseando punto: {e}")
+                
+                elem.clear()
     
     except ET.ParseError as e:
         raise ValueError(f"Error parseando archivo KML: {e}")
     except FileNotFoundError:
         raise ValueError(f"Archivo KML no encontrado: {kml_path}")
+    except OSError as e:
+        # lxml informa los archivos inexistentes o ilegibles como OSError genérico
+        raise ValueError(f"No se pudo leer el archivo KML: {e}")
+    
+    for name, lat, lng in points:
+        # Usar el nombre del placemark o generar uno
+        n_vertices += 1
+        yield (name if name is not None else f"Punto_{n_vertices}", lat, lng)
+
+def parse_kml_polygon(kml_path: Union[str, BinaryIO]) -> List[Tuple[float, float, str]]:
+    """Extrae vértices de polígonos de un archivo KML.
+    
+    Args:
+        kml_path: Ruta al archivo KML o un objeto tipo archivo (binario) ya abierto
+        
+    Returns:
+        Lista de tuplas (nombre, lat, lng) con los vértices del polígono
+    """
+    coordinates = list(iter_kml_coordinates(kml_path))
     
     if not coordinates:
         raise ValueError("No se encontraron coordenadas válidas en el archivo KML")
     
     return coordinates
 
-def convert_kml_to_csv(input_path: str, output_base: str, target_system: str = "gk") -> None:
+def convert_kml_to_csv(input_path: str, output_base: str, target_system: str = "gk",
+                       pretty: bool = False, formats: Set[str] = frozenset(DEFAULT_FORMATS),
+                       verbose: bool = False, backend: str = 'auto',
+                       kmz_compress: str = 'fast') -> None:
     """Convierte un archivo KML con polígonos a CSV con coordenadas convertidas.
     
     Args:
         input_path: Ruta al archivo KML de entrada
         output_base: Nombre base para los archivos de salida
         target_system: Sistema de destino ('gk' para Gauss-Krüger, 'wgs84' para WGS84)
+        pretty: Si es True, el GeoJSON se escribe indentado
+        formats: Archivos a generar en modo WGS84 ('csv', 'kml', 'kmz', 'geojson', 'gpkg')
+        verbose: Si es True, informa cada punto convertido (modo Gauss-Krüger)
+        backend: Motor de transformación ('auto', 'pyproj', 'numba' o 'affine', modo Gauss-Krüger)
+        kmz_compress: Compresión del KMZ ('store', 'fast' o 'default', modo WGS84)
     """
+    _check_backend(backend)
+    if target_system.lower() != "gk":
+        _check_formats(formats)
+    
     # Extraer coordenadas del KML
     coordinates = parse_kml_polygon(input_path)
     
     print(f"Extraídos {len(coordinates)} vértices del archivo KML")
     
-    # Crear archivo CSV temporal con las coordenadas extraídas
-    temp_csv = f"{output_base}_temp.csv"
+    # Pasar los vértices directamente como arrays, sin CSV intermedio
+    names = [name for name, _, _ in coordinates]
+    lats = np.fromiter((lat for _, lat, _ in coordinates), dtype=np.float64, count=len(coordinates))
+    lngs = np.fromiter((lng for _, _, lng in coordinates), dtype=np.float64, count=len(coordinates))
     
-    with open(temp_csv, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.writer(f)
-        writer.writerow(['nombre', 'lat', 'lng'])
+    if target_system.lower() == "gk":
+        _wgs84_to_gk_blocks([(names, lats, lngs)], output_base, verbose=verbose, backend=backend)
+        print(f"\nConversión de KML a Gauss-Krüger completada.")
+    else:
+        # Si ya está en WGS84, solo generar los archivos de salida
+        output_dir = os.path.dirname(output_base)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
         
-        for name, lat, lng in coordinates:
-            writer.writerow([name, lat, lng])
-    
-    try:
-        # Convertir usando las funciones existentes
-        if target_system.lower() == "gk":
-            convert_wgs84_to_gk(temp_csv, output_base)
-            print(f"\nConversión de KML a Gauss-Krüger completada.")
-        else:
-            # Si ya está en WGS84, solo generar los archivos de salida
-            final_csv = f"{output_base}.csv"
-            
-            # Copiar el archivo temporal al final
-            with open(temp_csv, 'r', encoding='utf-8') as src, \
-                 open(final_csv, 'w', newline='', encoding='utf-8') as dst:
-                dst.write(src.read())
-            
-            # Crear archivos KML y GeoJSON
-            create_kml(f"{output_base}.kml", coordinates, name=Path(input_path).stem)
-            create_geojson(f"{output_base}.geojson", coordinates, name=Path(input_path).stem)
-            
-            print(f"\nExtracción de vértices de KML completada.")
-    
-    finally:
-        # Limpiar archivo temporal
-        if Path(temp_csv).exists():
-            Path(temp_csv).unlink()
+        if 'csv' in formats:
+            with open(f"{output_base}.csv", 'w', newline='', encoding='utf-8', buffering=IO_BUFFER_SIZE) as f:
+                writer = csv.writer(f)
+                writer.writerow(['nombre', 'lat', 'lng'])
+                writer.writerows(coordinates)
+        
+        # Crear archivos KML, KMZ, GeoJSON y GeoPackage
+        if 'kml' in formats or 'kmz' in formats:
+            kml = create_kml(f"{output_base}.kml" if 'kml' in formats else None,
+                             lats, lngs, name=Path(input_path).stem)
+            if 'kmz' in formats:
+                create_kmz(kml, f"{output_base}.kmz", compression=kmz_compress)
+        if 'geojson' in formats:
+            create_geojson(f"{output_base}.geojson", lats, lngs, name=Path(input_path).stem, pretty=pretty)
+        if 'gpkg' in formats:
+            create_gpkg(f"{output_base}.gpkg", lats, lngs, name=Path(input_path).stem)
+        
+        print(f"\nExtracción de vértices de KML completada.")
 
-def create_kml(output_path: str, coordinates: list, name: str = "Polígono") -> None:
-    """Crea un archivo KML con un polígono a partir de las coordenadas.
-    
-    Args:
-        output_path: Ruta donde se guardará el archivo KML
-        coordinates: Lista de tuplas (lat, lng, nombre)
-        name: Nombre del polígono en el KML
-    """
-    # Crear el contenido KML
-    kml_template = """<?xml version="1.0" encoding="UTF-8"?>
+# Plantilla KML del polígono, partida una sola vez alrededor de las coordenadas
+_KML_TEMPLATE = """<?xml version="1.0" encoding="UTF-8"?>
 <kml xmlns="http://www.opengis.net/kml/2.2">
   <Document>
     <name>{name}</name>
@@ -194,108 +633,202 @@ def create_kml(output_path: str, coordinates: list, name: str = "Polígono") ->
     </Placemark>
   </Document>
 </kml>"""
+_KML_HEAD, _KML_TAIL = _KML_TEMPLATE.split('              {coordinates}\n')
+
+def create_kml(output_path: Optional[str], lats: np.ndarray, lngs: np.ndarray, name: str = "Polígono") -> str:
+    """Crea un archivo KML con un polígono a partir de las coordenadas.
     
-    # Preparar las coordenadas en el formato correcto para KML (lng,lat,altitud)
-    coords_list = []
-    for lat, lng, _ in coordinates:
-        # Formato: longitud,latitud,altura (0 por defecto)
-        coords_list.append(f"{lng:.15f},{lat:.15f},0")
-    
+    Args:
+        output_path: Ruta donde se guardará el archivo KML (None para solo generar el contenido)
+        lats: Array de latitudes
+        lngs: Array de longitudes
+        name: Nombre del polígono en el KML
+        
+    Returns:
+        El contenido KML generado, para reutilizarlo (por ejemplo en el KMZ)
+    """
     # Cerrar el polígono repitiendo el primer punto al final
-    if coordinates:
-        first_lat, first_lng, _ = coordinates[0]
-        coords_list.append(f"{first_lng:.15f},{first_lat:.15f},0")
+    ring = np.column_stack([lngs, lats])
+    if len(ring):
+        ring = np.vstack([ring, ring[:1]])
     
-    coords_str = '\n              '.join(coords_list)
+    # Armar el KML: cabecera, coordenadas (lng,lat,altitud 0) y cierre
+    buf = io.StringIO()
+    buf.write(_KML_HEAD.format(name=name))
+    np.savetxt(buf, ring, fmt='              %.15f,%.15f,0')
+    buf.write(_KML_TAIL)
+    kml = buf.getvalue()
     
     # Escribir el archivo KML
-    with open(output_path, 'w', encoding='utf-8') as f:
-        f.write(kml_template.format(name=name, coordinates=coords_str))
-    
-    print(f"\nArchivo KML generado: {output_path}")
+    if output_path is not None:
+        with open(output_path, 'w', encoding='utf-8') as f:
+            f.write(kml)
+        
+        print(f"\nArchivo KML generado: {output_path}")
+    return kml
 
-def create_kmz(kml_path: str, kmz_path: str) -> None:
-    """Crea un archivo KMZ a partir de un archivo KML.
+# Compresión del KMZ: (método, nivel). 'fast' comprime casi igual con mucho menos CPU
+KMZ_COMPRESSION = {
+    'store': (zipfile.ZIP_STORED, None),
+    'fast': (zipfile.ZIP_DEFLATED, 1),
+    'default': (zipfile.ZIP_DEFLATED, None),
+}
+
+def create_kmz(kml: str, kmz_path: str, compression: str = 'fast') -> None:
+    """Crea un archivo KMZ a partir de contenido KML ya generado.
     
     Args:
-        kml_path: Ruta al archivo KML de entrada
+        kml: Contenido KML (el devuelto por create_kml)
         kmz_path: Ruta donde se guardará el archivo KMZ
+        compression: Nivel de compresión: 'store', 'fast' o 'default' (ver KMZ_COMPRESSION)
     """
+    method, level = KMZ_COMPRESSION[compression]
     try:
         # Crear un archivo ZIP con extensión .kmz
-        with zipfile.ZipFile(kmz_path, 'w', zipfile.ZIP_DEFLATED) as kmz:
-            # Añadir el archivo KML al KMZ
-            kmz.write(kml_path, 'doc.kml')
+        with zipfile.ZipFile(kmz_path, 'w', method, compresslevel=level) as kmz:
+            # Añadir el KML desde memoria, sin volver a leerlo del disco
+            kmz.writestr('doc.kml', kml.encode('utf-8'))
             
         print(f"\nArchivo KMZ generado: {kmz_path}")
     except Exception as e:
         print(f"Error al crear el archivo KMZ: {e}")
 
-def convert_wgs84_to_gk(input_path: str, output_base: str) -> None:
-    """Convierte un archivo CSV con coordenadas WGS84 (lat/long) a Gauss-Krüger.
+def _read_coordinate_csv(input_path: str, required_columns: List[str], chunksize: int = None):
+    """Lee las columnas necesarias de un CSV con el parser en C de pandas.
+    
+    Returns:
+        Un DataFrame, o un iterador de DataFrames de ``chunksize`` filas
+    """
+    import pandas as pd
+    
+    # Verificar que el archivo tenga las columnas necesarias
+    try:
+        header = pd.read_csv(input_path, nrows=0, encoding='utf-8').columns
+    except pd.errors.EmptyDataError:
+        header = []
+    if not set(required_columns).issubset(header):
+        raise ValueError(f"El archivo debe contener las columnas: {', '.join(required_columns)}")
+    
+    # round_trip da exactamente los mismos valores que float()
+    return pd.read_csv(input_path, usecols=required_columns, dtype={'nombre': str},
+                       keep_default_na=False, float_precision='round_trip',
+                       encoding='utf-8', chunksize=chunksize)
+
+def _to_float64(column: pd.Series) -> np.ndarray:
+    """Convierte una columna a un array float64 propio, con la misma semántica que float()."""
+    import pandas as pd
+    
+    if pd.api.types.is_numeric_dtype(column):
+        return column.to_numpy(dtype=np.float64, copy=True)
+    return column.to_numpy(dtype=object).astype(np.float64)
+
+def _parse_coordinates(df: pd.DataFrame, x_col: str, y_col: str,
+                       first_row: int = 1) -> Tuple[List[str], np.ndarray, np.ndarray]:
+    """Extrae los nombres y las coordenadas como arrays float64 escribibles.
+    
+    Las filas con coordenadas inválidas se informan, numeradas desde ``first_row``,
+    y se descartan.
+    
+    Returns:
+        Tupla (nombres, xs, ys) con las filas válidas
+    """
+    names = df['nombre'].to_numpy(dtype=object)
+    try:
+        return names.tolist(), _to_float64(df[x_col]), _to_float64(df[y_col])
+    except (ValueError, TypeError):
+        pass
+    
+    # Hay valores inválidos: convertir fila por fila para informarlos
+    keep, xs, ys = [], [], []
+    for i, (x, y) in enumerate(zip(df[x_col].tolist(), df[y_col].tolist())):
+        try:
+            x, y = float(x), float(y)
+        except (ValueError, TypeError) as e:
+            print(f"Error en la fila {first_row + i}: {e}")
+            continue
+        keep.append(i)
+        xs.append(x)
+        ys.append(y)
+    return names[keep].tolist(), np.array(xs, dtype=np.float64), np.array(ys, dtype=np.float64)
+
+def _wgs84_to_gk_blocks(blocks: Iterable[Tuple[List[str], np.ndarray, np.ndarray]],
+                        output_base: str, verbose: bool = False, backend: str = 'auto') -> None:
+    """Transforma a Gauss-Krüger bloques (nombres, lats, lngs) y escribe el CSV de salida.
+    
+    Los arrays de cada bloque se transforman en el lugar.
     
     Args:
-        input_path: Ruta al archivo de entrada con columnas:
-                   - nombre: Nombre del punto
-                   - lat: Latitud en grados decimales
-                   - lng: Longitud en grados decimales
+        blocks: Iterable de tuplas (nombres, lats, lngs) en grados decimales
         output_base: Nombre base para los archivos de salida (sin extensión)
+        verbose: Si es True, informa cada punto convertido
+        backend: Motor de transformación ('auto', 'pyproj', 'numba' o 'affine')
     """
     # Definir la transformación de WGS84 a Gauss-Krüger (Campo Inchauspe)
     # Usando el EPSG:4326 (WGS84) a EPSG:22195 (Gauss-Krüger Zona 5 - Argentina)
-    transformer = Transformer.from_crs("EPSG:4326", "EPSG:22195", always_xy=True)
+    transformer = _get_transformer("EPSG:4326", "EPSG:22195")
     
-    # Asegurarse de que el directorio de salida exista
-    output_dir = Path(output_base).parent
-    if output_dir and not output_dir.exists():
-        output_dir.mkdir(parents=True)
+    # Asegurarse de que el directorio de salida exista (una sola llamada, sin carrera)
+    output_dir = os.path.dirname(output_base)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
     
     # Nombres de archivos de salida
     csv_path = f"{output_base}.csv"
     
-    with open(input_path, 'r', encoding='utf-8') as infile, \
-         open(csv_path, 'w', newline='', encoding='utf-8') as outfile:
-        
-        reader = csv.DictReader(infile)
-        
-        # Verificar que el archivo tenga las columnas necesarias
-        required_columns = ['nombre', 'lat', 'lng']
-        if not all(col in reader.fieldnames for col in required_columns):
-            raise ValueError(f"El archivo debe contener las columnas: {', '.join(required_columns)}")
-        
+    with open(csv_path, 'w', newline='', encoding='utf-8', buffering=IO_BUFFER_SIZE) as outfile:
         # Configurar el writer de salida
         fieldnames = ['nombre', 'lat', 'lng', 'coordenadas_gauss_kruger_easting', 'coordenadas_gauss_kruger_northing']
-        writer = csv.DictWriter(outfile, fieldnames=fieldnames)
-        writer.writeheader()
+        writer = csv.writer(outfile)
+        writer.writerow(fieldnames)
         
-        # Procesar cada fila
-        for row_num, row in enumerate(reader, 1):
-            try:
-                # Obtener las coordenadas
-                lat = float(row['lat'])
-                lng = float(row['lng'])
-                nombre = row['nombre']
-                
-                # Realizar la transformación de WGS84 a Gauss-Krüger
-                easting, northing = transformer.transform(lng, lat)
-                
-                # Escribir la fila de salida
-                writer.writerow({
-                    'nombre': nombre,
-                    'lat': lat,
-                    'lng': lng,
-                    'coordenadas_gauss_kruger_easting': easting,
-                    'coordenadas_gauss_kruger_northing': northing
-                })
-                
-                print(f"Convertido: {nombre} -> Easting: {easting:.6f}, Northing: {northing:.6f}")
-                
-            except (ValueError, KeyError) as e:
-                print(f"Error en la fila {row_num}: {e}")
+        total = 0
+        for names, lats, lngs in blocks:
+            # Guardar los valores originales y transformar en el lugar, una llamada por bloque
+            lat_list, lng_list = lats.tolist(), lngs.tolist()
+            eastings, northings = _transform_wgs84_to_gk(transformer, lngs, lats, backend)
+            
+            # Escribir las filas de salida del bloque
+            easting_list, northing_list = eastings.tolist(), northings.tolist()
+            writer.writerows(zip(names, lat_list, lng_list, easting_list, northing_list))
+            total += len(names)
+            
+            if verbose:
+                for nombre, easting, northing in zip(names, easting_list, northing_list):
+                    print(f"Convertido: {nombre} -> Easting: {easting:.6f}, Northing: {northing:.6f}")
     
+    print(f"Convertidos {total} puntos a Gauss-Krüger")
     print(f"\nArchivo CSV generado: {csv_path}")
 
-def convert_gk_to_wgs84(input_path: str, output_base: str) -> None:
+def convert_wgs84_to_gk(input_path: str, output_base: str, verbose: bool = False,
+                        backend: str = 'auto') -> None:
+    """Convierte un archivo CSV con coordenadas WGS84 (lat/long) a Gauss-Krüger.
+    
+    Args:
+        input_path: Ruta al archivo de entrada con columnas:
+                   - nombre: Nombre del punto
+                   - lat: Latitud en grados decimales
+                   - lng: Longitud en grados decimales
+        output_base: Nombre base para los archivos de salida (sin extensión)
+        verbose: Si es True, informa cada punto convertido
+        backend: Motor de transformación ('auto', 'pyproj', 'numba' o 'affine')
+    """
+    _check_backend(backend)
+    
+    # Leer por bloques de CHUNK_SIZE filas: memoria acotada con archivos enormes
+    required_columns = ['nombre', 'lat', 'lng']
+    chunks = _read_coordinate_csv(input_path, required_columns, chunksize=CHUNK_SIZE)
+    
+    def blocks():
+        first_row = 1
+        for chunk in chunks:
+            yield _parse_coordinates(chunk, 'lat', 'lng', first_row)
+            first_row += len(chunk)
+    
+    _wgs84_to_gk_blocks(blocks(), output_base, verbose=verbose, backend=backend)
+
+def convert_gk_to_wgs84(input_path: str, output_base: str, pretty: bool = False,
+                        kmz_compress: str = 'fast', formats: Set[str] = frozenset(DEFAULT_FORMATS),
+                        verbose: bool = False, backend: str = 'auto') -> None:
     """Convierte un archivo CSV con coordenadas Gauss-Krüger a WGS84.
     
     Args:
@@ -304,81 +837,94 @@ def convert_gk_to_wgs84(input_path: str, output_base: str) -> None:
                    - coordenadas_gauss_kruger_easting: Coordenada X (Easting)
                    - coordenadas_gauss_kruger_northing: Coordenada Y (Northing)
         output_base: Nombre base para los archivos de salida (sin extensión)
+        pretty: Si es True, el GeoJSON se escribe indentado
+        kmz_compress: Compresión del KMZ ('store', 'fast' o 'default')
+        formats: Archivos a generar (subconjunto de OUTPUT_FORMATS)
+        verbose: Si es True, informa cada punto convertido
+        backend: Motor de transformación ('auto', 'pyproj', 'numba' o 'affine')
     """
+    _check_backend(backend)
+    _check_formats(formats)
+    
     # Definir la transformación de Gauss-Krüger (Campo Inchauspe) a WGS84
     # Usando el EPSG:22195 (Gauss-Krüger Zona 5 - Argentina)
-    transformer = Transformer.from_crs("EPSG:22195", "EPSG:4326", always_xy=True)
-    
-    # Asegurarse de que el directorio de salida exista
-    output_dir = Path(output_base).parent
-    if output_dir and not output_dir.exists():
-        output_dir.mkdir(parents=True)
+    transformer = _get_transformer("EPSG:22195", "EPSG:4326")
     
     # Nombres de archivos de salida
     csv_path = f"{output_base}.csv"
     kml_path = f"{output_base}.kml"
     kmz_path = f"{output_base}.kmz"
     geojson_path = f"{output_base}.geojson"
+    gpkg_path = f"{output_base}.gpkg"
     
-    # Lista para almacenar todas las coordenadas para el KML
-    all_coordinates = []
+    # Si solo se pide el CSV no hace falta tener el polígono completo: se lee por bloques
+    # de CHUNK_SIZE filas, con memoria acotada. Si no, un único bloque con todas las filas
+    required_columns = ['nombre', 'coordenadas_gauss_kruger_easting', 'coordenadas_gauss_kruger_northing']
+    streaming = not set(formats) - {'csv'}
+    data = _read_coordinate_csv(input_path, required_columns, chunksize=CHUNK_SIZE if streaming else None)
+    chunks = data if streaming else [data]
     
-    with open(input_path, 'r', encoding='utf-8') as infile, \
-         open(csv_path, 'w', newline='', encoding='utf-8') as outfile:
-        
-        reader = csv.DictReader(infile)
-        
-        # Verificar que el archivo tenga las columnas necesarias
-        required_columns = ['nombre', 'coordenadas_gauss_kruger_easting', 'coordenadas_gauss_kruger_northing']
-        if not all(col in reader.fieldnames for col in required_columns):
-            raise ValueError(f"El archivo debe contener las columnas: {', '.join(required_columns)}")
-        
-        # Configurar el writer de salida
-        fieldnames = ['nombre', 'lat', 'lng']
-        writer = csv.DictWriter(outfile, fieldnames=fieldnames)
-        writer.writeheader()
+    # Asegurarse de que el directorio de salida exista (una sola llamada, sin carrera)
+    output_dir = os.path.dirname(output_base)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    
+    with (open(csv_path, 'w', newline='', encoding='utf-8', buffering=IO_BUFFER_SIZE)
+          if 'csv' in formats else contextlib.nullcontext()) as outfile:
+        if outfile is not None:
+            writer = csv.writer(outfile)
+            writer.writerow(['nombre', 'lat', 'lng'])
         
-        # Procesar cada fila
-        for row_num, row in enumerate(reader, 1):
-            try:
-                # Obtener las coordenadas
-                easting = float(row['coordenadas_gauss_kruger_easting'])
-                northing = float(row['coordenadas_gauss_kruger_northing'])
-                nombre = row['nombre']
-                
-                # Realizar la transformación de Gauss-Krüger a WGS84
-                # Usando el transformador definido al inicio
-                lng, lat = transformer.transform(easting, northing)
-                
-                # Guardar para el KML
-                all_coordinates.append((lat, lng, nombre))
-                
-                # Escribir la fila de salida
-                writer.writerow({
-                    'nombre': nombre,
-                    'lat': lat,
-                    'lng': lng
-                })
-                
-                print(f"Convertido: {nombre} -> {lat:.10f}, {lng:.10f}")
-                
-            except (ValueError, KeyError) as e:
-                print(f"Error en la fila {row_num}: {e}")
+        first_row = 1
+        total = 0
+        for chunk in chunks:
+            names, xs, ys = _parse_coordinates(chunk, 'coordenadas_gauss_kruger_easting',
+                                               'coordenadas_gauss_kruger_northing', first_row)
+            first_row += len(chunk)
+            
+            # Transformar todos los puntos del bloque de una vez
+            lngs, lats = _transform_gk_to_wgs84(transformer, xs, ys, backend)
+            lat_list, lng_list = lats.tolist(), lngs.tolist()
+            if outfile is not None:
+                writer.writerows(zip(names, lat_list, lng_list))
+            total += len(names)
+            
+            if verbose:
+                for nombre, lat, lng in zip(names, lat_list, lng_list):
+                    print(f"Convertido: {nombre} -> {lat:.10f}, {lng:.10f}")
     
-    # Generar los archivos de salida si hay coordenadas
-    if all_coordinates:
-        create_kml(kml_path, all_coordinates, name=Path(input_path).stem)
-        create_kmz(kml_path, kmz_path)
-        create_geojson(geojson_path, all_coordinates, name=Path(input_path).stem)
+    print(f"Convertidos {total} puntos a WGS84")
+    
+    # Generar los archivos del polígono (sin streaming hubo un solo bloque con todos los puntos)
+    if not streaming and names:
+        if 'kml' in formats or 'kmz' in formats:
+            kml = create_kml(kml_path if 'kml' in formats else None, lats, lngs, name=Path(input_path).stem)
+            if 'kmz' in formats:
+                create_kmz(kml, kmz_path, compression=kmz_compress)
+        if 'geojson' in formats:
+            create_geojson(geojson_path, lats, lngs, name=Path(input_path).stem, pretty=pretty)
+        if 'gpkg' in formats:
+            create_gpkg(gpkg_path, lats, lngs, name=Path(input_path).stem)
 
-def create_geojson(output_path: str, coordinates: List[Tuple[float, float, str]], name: str = "Polígono") -> None:
+def create_geojson(output_path: str, lats: np.ndarray, lngs: np.ndarray, name: str = "Polígono",
+                   pretty: bool = False) -> None:
     """Crea un archivo GeoJSON con un polígono a partir de las coordenadas.
     
     Args:
         output_path: Ruta donde se guardará el archivo GeoJSON
-        coordinates: Lista de tuplas (lat, lng, nombre)
+        lats: Array de latitudes
+        lngs: Array de longitudes
         name: Nombre del polígono en el GeoJSON
+        pretty: Si es True, indenta el JSON; si no, lo escribe compacto
     """
+    # Anillo en formato GeoJSON [lng, lat]; se cierra solo si hay suficientes puntos
+    n = len(lats)
+    ring = np.empty((n + 1 if n > 2 else n, 2), dtype=np.float64)
+    ring[:n, 0] = lngs
+    ring[:n, 1] = lats
+    if n > 2:
+        ring[n] = ring[0]
+    
     # Crear la estructura GeoJSON
     geojson = {
         "type": "FeatureCollection",
@@ -398,80 +944,169 @@ def create_geojson(output_path: str, coordinates: List[Tuple[float, float, str]]
                 },
                 "geometry": {
                     "type": "Polygon",
-                    "coordinates": [
-                        # Formato GeoJSON: [lng, lat] para cada punto con 15 decimales
-                        [[round(lng, 15), round(lat, 15)] for lat, lng, _ in coordinates] + 
-                        # Cerrar el polígono solo si hay suficientes puntos
-                        ([[round(coordinates[0][1], 15), round(coordinates[0][0], 15)]] if len(coordinates) > 2 else [])
-                    ]
+                    "coordinates": None
                 }
             }
         ]
     }
+    geometry = geojson["features"][0]["geometry"]
     
     # Escribir el archivo GeoJSON
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(geojson, f, indent=2, ensure_ascii=False)
+    if pretty:
+        # Indentado: se serializa el documento completo (orjson acepta el array directamente)
+        if orjson is not None:
+            geometry["coordinates"] = [ring]
+            with open(output_path, 'wb') as f:
+                f.write(orjson.dumps(geojson, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_INDENT_2))
+        else:
+            geometry["coordinates"] = [ring.tolist()]
+            with open(output_path, 'w', encoding='utf-8') as f:
+                json.dump(geojson, f, indent=2, ensure_ascii=False)
+    else:
+        # Compacto: el envoltorio se serializa una vez y el anillo se escribe por bloques,
+        # sin armar todo el JSON en memoria
+        geometry["coordinates"] = ["__anillo__"]
+        if orjson is not None:
+            envelope = orjson.dumps(geojson)
+            dump_block = lambda block: orjson.dumps(block, option=orjson.OPT_SERIALIZE_NUMPY)
+        else:
+            envelope = json.dumps(geojson, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+            dump_block = lambda block: json.dumps(block.tolist(), separators=(',', ':')).encode('utf-8')
+        
+        # El marcador es el último valor del documento: los nombres van antes
+        head, tail = envelope.rsplit(b'"__anillo__"', 1)
+        with open(output_path, 'wb', buffering=IO_BUFFER_SIZE) as f:
+            f.write(head + b'[')
+            for start in range(0, len(ring), CHUNK_SIZE):
+                if start:
+                    f.write(b',')
+                # Sin los corchetes externos del bloque: [[x,y],[x,y]] -> [x,y],[x,y]
+                f.write(dump_block(ring[start:start + CHUNK_SIZE])[1:-1])
+            f.write(b']' + tail)
     
     print(f"\nArchivo GeoJSON generado: {output_path}")
 
+def _check_formats(formats: Set[str]) -> None:
+    """Verifica que estén instaladas las dependencias de los formatos pedidos."""
+    if 'gpkg' in formats and pyogrio is None:
+        raise ValueError("La salida GeoPackage (gpkg) requiere tener instalado pyogrio")
+
+def create_gpkg(output_path: str, lats: np.ndarray, lngs: np.ndarray, name: str = "Polígono") -> None:
+    """Crea un archivo GeoPackage con un polígono a partir de las coordenadas.
+    
+    Más liviano que GeoJSON para abrir en QGIS; requiere pyogrio (GDAL).
+    
+    Args:
+        output_path: Ruta donde se guardará el archivo GeoPackage
+        lats: Array de latitudes
+        lngs: Array de longitudes
+        name: Nombre del polígono (y de la capa)
+    """
+    # Anillo [lng, lat], cerrado igual que en el GeoJSON
+    n = len(lats)
+    ring = np.empty((n + 1 if n > 2 else n, 2), dtype='<f8')
+    ring[:n, 0] = lngs
+    ring[:n, 1] = lats
+    if n > 2:
+        ring[n] = ring[0]
+    
+    # Geometría en WKB (little endian, Polygon con un anillo): no hace falta shapely
+    wkb = struct.pack('<BIII', 1, 3, 1, len(ring)) + ring.tobytes()
+    
+    pyogrio.raw.write(output_path, np.array([wkb], dtype=object),
+                      [np.array([name], dtype=object), np.array(["Polígono generado automáticamente"], dtype=object)],
+                      ['name', 'description'], layer=name, driver='GPKG',
+                      geometry_type='Polygon', crs='EPSG:4326')
+    
+    print(f"\nArchivo GeoPackage generado: {output_path}")
+
+# Modos de conversión del CLI
+_MODES = ('gk_to_wgs84', 'wgs84_to_gk', 'kml_to_gk', 'kml_to_wgs84')
+
+def _parse_formats(value: str) -> Set[str]:
+    """Interpreta el valor de --formats (lista separada por comas)."""
+    formats = {fmt.strip().lower() for fmt in value.split(',') if fmt.strip()}
+    unknown = formats - set(OUTPUT_FORMATS)
+    if unknown or not formats:
+        raise argparse.ArgumentTypeError(
+            f"formatos no válidos: {', '.join(sorted(unknown)) or value!r}. Use: {', '.join(OUTPUT_FORMATS)}")
+    return formats
+
 def main():
-    if len(sys.argv) != 4:
-        print("Uso:")
-        print("  python convert_gk_to_wgs84.py gk_to_wgs84 input.csv output_base_name")
-        print("  python convert_gk_to_wgs84.py wgs84_to_gk input.csv output_base_name")
-        print("  python convert_gk_to_wgs84.py kml_to_gk input.kml output_base_name")
-        print("  python convert_gk_to_wgs84.py kml_to_wgs84 input.kml output_base_name")
-        print("\nModos disponibles:")
-        print("  gk_to_wgs84: Convierte de Gauss-Krüger a WGS84 (lat/lng)")
-        print("  wgs84_to_gk: Convierte de WGS84 (lat/lng) a Gauss-Krüger")
-        print("  kml_to_gk: Extrae vértices de KML y convierte a Gauss-Krüger")
-        print("  kml_to_wgs84: Extrae vértices de KML y mantiene en WGS84")
-        print("\nFormatos de entrada:")
-        print("  Para gk_to_wgs84: nombre,coordenadas_gauss_kruger_easting,coordenadas_gauss_kruger_northing")
-        print("  Para wgs84_to_gk: nombre,lat,lng")
-        print("  Para kml_to_*: Archivo KML con polígonos o puntos")
-        sys.exit(1)
-        
-    mode = sys.argv[1]
-    input_path = sys.argv[2]
-    output_base = sys.argv[3]
-    
-    # Validar modo
-    valid_modes = ['gk_to_wgs84', 'wgs84_to_gk', 'kml_to_gk', 'kml_to_wgs84']
-    if mode not in valid_modes:
-        print(f"Error: Modo '{mode}' no válido. Use uno de: {', '.join(valid_modes)}")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(
+        description="Convierte coordenadas entre Gauss-Krüger y WGS84 (Google Maps).",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""Modos disponibles:
+  gk_to_wgs84: Convierte de Gauss-Krüger a WGS84 (lat/lng)
+  wgs84_to_gk: Convierte de WGS84 (lat/lng) a Gauss-Krüger
+  kml_to_gk: Extrae vértices de KML y convierte a Gauss-Krüger
+  kml_to_wgs84: Extrae vértices de KML y mantiene en WGS84
+
+Formatos de entrada:
+  Para gk_to_wgs84: nombre,coordenadas_gauss_kruger_easting,coordenadas_gauss_kruger_northing
+  Para wgs84_to_gk: nombre,lat,lng
+  Para kml_to_*: Archivo KML con polígonos o puntos""")
+    parser.add_argument('mode', choices=_MODES,
+                        help="Modo de conversión")
+    parser.add_argument('input_path', help="Archivo de entrada (CSV o KML)")
+    parser.add_argument('output_base', help="Nombre base para los archivos de salida")
+    parser.add_argument('--pretty', action='store_true',
+                        help="Escribir el GeoJSON indentado (más lento y más grande)")
+    parser.add_argument('-v', '--verbose', action='store_true',
+                        help="Mostrar cada punto convertido (más lento en archivos grandes)")
+    parser.add_argument('--formats', type=_parse_formats, default=set(DEFAULT_FORMATS),
+                        help="Archivos a generar, separados por coma (por defecto: csv,kml,kmz,geojson; "
+                             "gpkg requiere pyogrio)")
+    parser.add_argument('--kmz-compress', choices=list(KMZ_COMPRESSION), default='fast',
+                        help="Compresión del KMZ: store (sin comprimir), fast (nivel 1) o default (nivel 6)")
+    parser.add_argument('--backend', choices=TRANSFORM_BACKENDS, default='auto',
+                        help="Motor de transformación: auto (según el tamaño), pyproj, numba (requiere numba) "
+                             "o affine (aproximación afín de GK a WGS84, error de hasta ~1 mm)")
+    args = parser.parse_args()
     
-    # Eliminar la extensión si se proporcionó
-    output_base = Path(output_base).with_suffix('')
+    mode = args.mode
+    input_path = args.input_path
+    output_base = args.output_base
     
-    if not Path(input_path).exists():
-        print(f"Error: El archivo de entrada '{input_path}' no existe.")
-        sys.exit(1)
+    # Eliminar la extensión si se proporcionó
+    output_base = os.path.splitext(output_base)[0]
     
     try:
         if mode == 'gk_to_wgs84':
-            convert_gk_to_wgs84(input_path, str(output_base))
+            convert_gk_to_wgs84(input_path, output_base, pretty=args.pretty,
+                                kmz_compress=args.kmz_compress, formats=args.formats,
+                                verbose=args.verbose, backend=args.backend)
             print(f"\nConversión de Gauss-Krüger a WGS84 completada. Archivos generados:")
-            print(f"- {output_base}.csv: Coordenadas en formato CSV")
-            print(f"- {output_base}.kml: Polígono en formato KML")
-            print(f"- {output_base}.kmz: Polígono en formato KMZ")
-            print(f"- {output_base}.geojson: Polígono en formato GeoJSON")
+            for fmt, description in (('csv', 'Coordenadas en formato CSV'),
+                                     ('kml', 'Polígono en formato KML'),
+                                     ('kmz', 'Polígono en formato KMZ'),
+                                     ('geojson', 'Polígono en formato GeoJSON'),
+                                     ('gpkg', 'Polígono en formato GeoPackage')):
+                if fmt in args.formats:
+                    print(f"- {output_base}.{fmt}: {description}")
         elif mode == 'wgs84_to_gk':
-            convert_wgs84_to_gk(input_path, str(output_base))
+            convert_wgs84_to_gk(input_path, output_base, verbose=args.verbose, backend=args.backend)
             print(f"\nConversión de WGS84 a Gauss-Krüger completada. Archivo generado:")
             print(f"- {output_base}.csv: Coordenadas en formato CSV")
         elif mode == 'kml_to_gk':
-            convert_kml_to_csv(input_path, str(output_base), "gk")
+            convert_kml_to_csv(input_path, output_base, "gk", verbose=args.verbose, backend=args.backend)
             print(f"\nArchivos generados:")
             print(f"- {output_base}.csv: Vértices convertidos a Gauss-Krüger")
         elif mode == 'kml_to_wgs84':
-            convert_kml_to_csv(input_path, str(output_base), "wgs84")
+            convert_kml_to_csv(input_path, output_base, "wgs84", pretty=args.pretty, formats=args.formats,
+                               kmz_compress=args.kmz_compress)
             print(f"\nArchivos generados:")
-            print(f"- {output_base}.csv: Vértices extraídos en WGS84")
-            print(f"- {output_base}.kml: Polígono en formato KML")
-            print(f"- {output_base}.geojson: Polígono en formato GeoJSON")
+            for fmt, description in (('csv', 'Vértices extraídos en WGS84'),
+                                     ('kml', 'Polígono en formato KML'),
+                                     ('kmz', 'Polígono en formato KMZ'),
+                                     ('geojson', 'Polígono en formato GeoJSON'),
+                                     ('gpkg', 'Polígono en formato GeoPackage')):
+                if fmt in args.formats:
+                    print(f"- {output_base}.{fmt}: {description}")
+    except FileNotFoundError as e:
+        # Sin chequeo previo: el error sale de la apertura misma del archivo
+        print(f"Error: El archivo de entrada '{e.filename or input_path}' no existe.")
+        sys.exit(1)
     except Exception as e:
         print(f"\nError durante la conversión: {e}", file=sys.stderr)
         sys.exit(1)
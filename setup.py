@@ -17,6 +17,7 @@ setup(
     install_requires=[
         "pyproj>=3.6.1",
         "pandas>=2.1.0",
+        "numpy>=1.22.4",
     ],
     python_requires=">=3.8",
     entry_points={